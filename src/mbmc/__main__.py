@@ -1,5 +1,6 @@
 import sys
 from argparse import ArgumentParser
+from pathlib import Path
 from queue import Queue
 from time import sleep
 
@@ -9,9 +10,14 @@ from mbmc.addrelease import start_server, edit_release, add_release
 from mbmc.gui import CollectorApp
 from mbmc.match_releases import (
     get_providers,
-    find_missing_releases,
+    match_existing_release,
+    resolve_artist_credits,
+    resolve_isrc_releases,
     to_mb_release, merge_mb_release,
 )
+from mbmc.music_brainz import use_local_index
+from mbmc.clustering import cluster_albums, title_key
+from mbmc.prefetch import DetailPrefetcher, UPCOMING_QUESTIONS
 from mbmc.progress import Progress
 from mbmc.providers.music_brainz_provider import MusicBrainzProvider
 from mbmc.providers.provider import Album, AlbumStatus
@@ -33,7 +39,15 @@ def main() -> int:
         help="Urls that are not to be used",
         default=[],
     )
+    parser.add_argument(
+        "--local-index",
+        "-l",
+        type=Path,
+        help="Answer MusicBrainz lookups from a local index built with `python -m mbmc.local_index`",
+    )
     args = parser.parse_args()
+    if args.local_index is not None:
+        use_local_index(args.local_index)
     dotenv.load_dotenv()
     app = CollectorApp()
 
@@ -45,11 +59,9 @@ def main() -> int:
     progress = Progress(queue)
     progress.start()
 
-    existing_urls = find_missing_releases(MB_ID)
-
     relevant_banned = BANNED_ALBUMS.setdefault(MB_ID, [])
 
-    providers = get_providers(MB_ID, queue, args.banned_urls, existing_urls + relevant_banned)
+    providers = get_providers(MB_ID, queue, args.banned_urls, relevant_banned)
     mb_provider = providers[-1]
     non_mb_providers = providers[:-1]
 
@@ -57,44 +69,69 @@ def main() -> int:
     queue.join()
     progress.join()
 
-    while True:
-        for provider in non_mb_providers:
-            current = provider.get_todo_name()
-            if current is not None:
-                break
-        else:
-            break
-        gathered_responses: list[Album] = []
-        for provider in non_mb_providers:
-            if provider.is_done(current):
-                continue
-            provider.query = current
-            response = app.ask_question(provider)
-            if response[0] == "banned":
-                if response[1]:
-                    relevant_banned.append(response[1].url)
-                    response[1].status = AlbumStatus.BANNED
-            elif response[1]:
-                gathered_responses.append(response[1])
-        if gathered_responses:
-            mb_provider.query = current
-            mb_response = app.ask_question(mb_provider)
-            if mb_response[1]:
-                gathered_responses.append(mb_response[1])
-            if any(
-                isinstance(album.provider, MusicBrainzProvider)
-                for album in gathered_responses
-            ):
-                results = merge_mb_release(gathered_responses, app)
-                if results:
-                    edit_release(results[0], results[1], not args.no_harmony)
-            else:
-                results = to_mb_release(gathered_responses, app)
-                if results:
-                    add_release(results, not args.no_harmony)
-        else:
+    clusters = cluster_albums(providers)
+    detail_prefetcher = DetailPrefetcher()
+    detail_prefetcher.start()
+
+    for cluster_index, cluster in enumerate(clusters):
+        while cluster.todo():
+            current = cluster.query()
+            detail_prefetcher.request(
+                [
+                    album
+                    for upcoming in clusters[cluster_index:cluster_index + UPCOMING_QUESTIONS]
+                    for album in upcoming.members
+                ]
+            )
+            gathered_responses: list[Album] = []
             for provider in non_mb_providers:
-                provider.ignore_album(current)
+                provider.suggestions = cluster.for_provider(provider)
+                # Albums that just missed the cluster (i.e. a bonus track) are still found by title
+                if not any(
+                    album.status == AlbumStatus.TODO
+                    for album in provider.suggestions + provider.candidates(current)
+                ):
+                    continue
+                provider.query = current
+                response = app.ask_question(provider)
+                if response[0] == "banned":
+                    if response[1]:
+                        relevant_banned.append(response[1].url)
+                        response[1].status = AlbumStatus.BANNED
+                elif response[1]:
+                    gathered_responses.append(response[1])
+                    resolve_artist_credits([response[1]])
+                    resolve_isrc_releases([response[1]])
+            if gathered_responses:
+                existing, candidates = match_existing_release(gathered_responses, mb_provider)
+                if existing is not None:
+                    # Certainly the same as an existing release, link to it directly
+                    gathered_responses.append(existing)
+                else:
+                    mb_provider.suggestions = candidates + [
+                        album
+                        for album in cluster.for_provider(mb_provider)
+                        if not any(album is candidate for candidate in candidates)
+                    ]
+                    mb_provider.query = current
+                    mb_response = app.ask_question(mb_provider)
+                    if mb_response[1]:
+                        gathered_responses.append(mb_response[1])
+                if any(
+                    isinstance(album.provider, MusicBrainzProvider)
+                    for album in gathered_responses
+                ):
+                    results = merge_mb_release(gathered_responses, app)
+                    if results:
+                        edit_release(results[0], results[1], not args.no_harmony)
+                else:
+                    results = to_mb_release(gathered_responses, app)
+                    if results:
+                        add_release(results, not args.no_harmony)
+            else:
+                for album in cluster.todo():
+                    if title_key(album) == current:
+                        album.status = AlbumStatus.IGNORED
 
     sleep(1)
     # when done with GUI:
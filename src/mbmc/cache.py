@@ -2,7 +2,7 @@ import pickle
 import sqlite3
 import threading
 from pathlib import Path
-from typing import Callable, TypeVar
+from typing import Any, Callable, Optional, TypeVar
 import inspect
 
 from mbmc.util import CACHE_DIR
@@ -33,46 +33,100 @@ def init_db():
 T = TypeVar("T", bound=Callable)
 
 
+def get_connection() -> sqlite3.Connection:
+    if not hasattr(local, "cache"):
+        local.cache = sqlite3.connect(CACHE_FILE)
+    return local.cache
+
+
+def lookup(name: str, input_value: str) -> tuple[bool, Any]:
+    """Look up a cached value, returning whether it was found and the value itself."""
+    retries: int = 0
+    while True:
+        try:
+            cursor = get_connection().execute(
+                "select rowid, value from cache where name = ? and input_value = ?",
+                (name, input_value),
+            )
+            row = cursor.fetchone()
+            if row:
+                get_connection().execute(
+                    "update cache set last_access = unixepoch() where rowid = ?",
+                    (row[0],),
+                )
+                get_connection().commit()
+                return True, pickle.loads(row[1])
+        except sqlite3.OperationalError:
+            retries += 1
+            if retries > 10:
+                raise RuntimeError("Could not connect to cache")
+        break
+    return False, None
+
+
+def store(name: str, input_value: str, value: Any) -> None:
+    get_connection().execute(
+        "insert into cache (name, input_value, value) values (?, ?, ?)",
+        (name, input_value, pickle.dumps(value)),
+    )
+    get_connection().commit()
+
+
 def cached(func: T) -> T:
     """Decorator to cache function results in a SQLite database."""
 
     def wrapper(*args, **kwargs):
-        if not hasattr(local, "cache"):
-            local.cache = sqlite3.connect(CACHE_FILE)
         name = f"{func.__module__}.{func.__qualname__}"
         if '.' in func.__qualname__ and not isinstance(func, staticmethod):
             input_value = repr(args[1:]) + repr(kwargs)  # skip 'self' or 'cls'
         else:
             input_value = repr(args) + repr(kwargs)
-        retries: int = 0
-        while True:
-            try:
-                cursor = local.cache.execute(
-                    "select rowid, value from cache where name = ? and input_value = ?",
-                    (name, input_value),
-                )
-                row = cursor.fetchone()
-                if row:
-                    local.cache.execute(
-                        "update cache set last_access = unixepoch() where rowid = ?",
-                        (row[0],),
-                    )
-                    local.cache.commit()
-                    return pickle.loads(row[1])
-            except sqlite3.OperationalError:
-                retries += 1
-                if retries > 10:
-                    raise RuntimeError("Could not connect to cache")
-            break
+        found, value = lookup(name, input_value)
+        if found:
+            return value
         result = func(*args, **kwargs)
-        local.cache.execute(
-            "insert into cache (name, input_value, value) values (?, ?, ?)",
-            (name, input_value, pickle.dumps(result)),
-        )
-        local.cache.commit()
+        store(name, input_value, result)
         return result
 
     return wrapper
 
 
+def cached_batch(func: T) -> T:
+    """
+    Decorator to cache results of a function mapping a list of inputs to a list of results.
+    Each input is cached separately, and the function is only called with the uncached inputs.
+    """
+
+    def wrapper(*args):
+        name = f"{func.__module__}.{func.__qualname__}"
+        *prefix, inputs = args
+        key_prefix = tuple(prefix[1:]) if '.' in func.__qualname__ else tuple(prefix)
+        results: dict[int, Any] = {}
+        missing: list[int] = []
+        for i, input in enumerate(inputs):
+            found, value = lookup(name, repr(key_prefix + (input,)))
+            if found:
+                results[i] = value
+            else:
+                missing.append(i)
+        if missing:
+            fetched = func(*prefix, [inputs[i] for i in missing])
+            for i, value in zip(missing, fetched):
+                store(name, repr(key_prefix + (inputs[i],)), value)
+                results[i] = value
+        return [results[i] for i in range(len(inputs))]
+
+    return wrapper
+
+
+def get_canonical_url(provider: str, native_id: str) -> Optional[str]:
+    """The canonical url of a release by its id in a provider's listings, if seen before."""
+    found, url = lookup(f"canonical_url.{provider}", native_id)
+    return url if found else None
+
+
+def store_canonical_url(provider: str, native_id: str, url: str) -> None:
+    store(f"canonical_url.{provider}", native_id, url)
+
+
 init_db()
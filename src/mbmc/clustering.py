@@ -0,0 +1,203 @@
+"""
+Group the albums of all providers into clusters that are probably the same release,
+so each release is asked for once, with the matching albums of every provider suggested.
+"""
+
+from dataclasses import dataclass, field
+from typing import Optional
+
+from fuzzywuzzy import fuzz
+
+from mbmc.cover_hash import CoverHashIndex
+from mbmc.fingerprint import FingerprintIndex, durations, matches
+from mbmc.music_brainz import normalize_barcode
+from mbmc.providers.music_brainz_provider import MusicBrainzProvider
+from mbmc.providers.provider import Provider, Album, AlbumStatus
+from mbmc.providers.title_index import TitleIndex
+
+TITLE_CUTOFF: int = 90
+"""minimum similarity (fuzz.ratio) of the whole titles of albums without matching barcodes to be clustered"""
+DURATION_TOLERANCE: float = 0.05
+"""maximum relative difference of the total durations of clustered albums"""
+COVER_TITLE_CUTOFF: int = 60
+"""minimum title similarity of albums only linked by their cover art, if their durations are unknown"""
+
+
+def track_count(album: Album) -> Optional[int]:
+    return len(album.tracks) or album.track_count
+
+
+def total_duration(album: Album) -> Optional[int]:
+    """Total duration in milliseconds, if known for every track."""
+    if not album.tracks or any(not track.duration for track in album.tracks):
+        return None
+    return sum(track.duration for track in album.tracks)
+
+
+def compatible(first: Album, second: Album) -> bool:
+    """Whether track counts and durations allow both albums to be the same release."""
+    first_count, second_count = track_count(first), track_count(second)
+    if first_count and second_count and first_count != second_count:
+        return False
+    first_duration, second_duration = total_duration(first), total_duration(second)
+    if first_duration and second_duration:
+        difference = abs(first_duration - second_duration)
+        if difference > DURATION_TOLERANCE * max(first_duration, second_duration):
+            return False
+    return True
+
+
+def title_key(album: Album) -> str:
+    return album.title.lower().strip()
+
+
+def same_artwork_release(first: Album, second: Album, index: TitleIndex) -> bool:
+    """
+    Whether albums with the same artwork are the same release: every known track duration agrees,
+    or, without durations to compare, their titles are somewhat similar.
+    """
+    first_durations, second_durations = durations(first), durations(second)
+    if any(first_durations) and any(second_durations):
+        return matches(first_durations, second_durations, min_known=1)
+    return compatible(first, second) and fuzz.ratio(
+        index.process(first.title), index.process(second.title)
+    ) >= COVER_TITLE_CUTOFF
+
+
+@dataclass
+class Cluster:
+    members: list[Album] = field(default_factory=list)
+    """albums of the cluster, best connected first"""
+
+    def query(self) -> str:
+        """
+        The title to ask for next, that of the best connected album still to do.
+        Only albums of that exact title are ignored if nothing is picked, the others get their own question.
+        """
+        return title_key(self.todo()[0])
+
+    def for_provider(self, provider: Provider) -> list[Album]:
+        return [album for album in self.members if album.provider is provider]
+
+    def todo(self) -> list[Album]:
+        return [
+            album
+            for album in self.members
+            if album.status == AlbumStatus.TODO and not isinstance(album.provider, MusicBrainzProvider)
+        ]
+
+
+class UnionFind:
+    def __init__(self, size: int):
+        self.parents: list[int] = list(range(size))
+
+    def find(self, item: int) -> int:
+        while self.parents[item] != item:
+            self.parents[item] = self.parents[self.parents[item]]
+            item = self.parents[item]
+        return self.parents[item]
+
+    def union(self, first: int, second: int) -> None:
+        first, second = self.find(first), self.find(second)
+        if first != second:
+            # Keep the earlier album as root, so clusters are ordered like the albums
+            self.parents[max(first, second)] = min(first, second)
+
+
+def cluster_albums(providers: list[Provider]) -> list[Cluster]:
+    """
+    Cluster the albums still to do of all providers, in the order they would have been asked.
+    MusicBrainz releases are only added to clusters as suggestions.
+    Albums are linked if their barcodes match, or if they are of different providers and
+    either their titles are very similar and their track counts and durations agree,
+    their track durations match one by one, or they have the same cover art and track count.
+    Candidate pairs are only taken from shared barcodes, shared title n-grams and equal
+    track counts, instead of comparing every pair.
+    """
+    albums = [
+        album
+        for provider in providers
+        for album in provider.albums
+        if album.status == AlbumStatus.TODO
+    ]
+    positions = {id(album): position for position, album in enumerate(albums)}
+    union_find = UnionFind(len(albums))
+    links: list[int] = [0] * len(albums)
+    # MusicBrainz releases join the cluster of an album they match, but never merge clusters
+    attachments: dict[int, int] = {}
+
+    def link(first: int, second: int) -> None:
+        first_mb = isinstance(albums[first].provider, MusicBrainzProvider)
+        second_mb = isinstance(albums[second].provider, MusicBrainzProvider)
+        if first_mb and second_mb:
+            return
+        if first_mb or second_mb:
+            release, album = (first, second) if first_mb else (second, first)
+            attachments.setdefault(release, album)
+        else:
+            union_find.union(first, second)
+        links[first] += 1
+        links[second] += 1
+
+    by_barcode: dict[str, list[int]] = {}
+    for position, album in enumerate(albums):
+        barcode = normalize_barcode(album.upn)
+        if barcode is not None:
+            by_barcode.setdefault(barcode, []).append(position)
+    for same_barcode in by_barcode.values():
+        for position in same_barcode[1:]:
+            link(same_barcode[0], position)
+
+    index = TitleIndex(Provider.normalize_name)
+    index.sync(albums)
+    for position, album in enumerate(albums):
+        similar_titles = index.similar(
+            album.title,
+            lambda other: other.provider is not album.provider,
+            TITLE_CUTOFF,
+        )
+        for other in similar_titles:
+            other_position = positions[id(other)]
+            if other_position > position and compatible(album, other):
+                link(position, other_position)
+
+    # Retitled or translated releases still have the same track durations
+    fingerprints = FingerprintIndex()
+    for album in albums:
+        fingerprints.add(album)
+    for position, album in enumerate(albums):
+        for other in fingerprints.search(album):
+            other_position = positions[id(other)]
+            if other_position > position and other.provider is not album.provider:
+                link(position, other_position)
+
+    # Artwork is often reused (i.e. for singles off an album), so track counts have to agree
+    covers = CoverHashIndex()
+    for album in albums:
+        covers.add(album)
+    for position, album in enumerate(albums):
+        for other in covers.search(album):
+            other_position = positions[id(other)]
+            if (
+                other_position > position
+                and other.provider is not album.provider
+                and track_count(album) is not None
+                and track_count(album) == track_count(other)
+                and same_artwork_release(album, other, index)
+            ):
+                link(position, other_position)
+
+    members: dict[int, list[int]] = {}
+    for position in range(len(albums)):
+        if isinstance(albums[position].provider, MusicBrainzProvider):
+            if position in attachments:
+                members.setdefault(union_find.find(attachments[position]), []).append(position)
+        else:
+            members.setdefault(union_find.find(position), []).append(position)
+    clusters: list[Cluster] = []
+    for root, cluster_positions in sorted(members.items()):
+        cluster_positions.sort(key=lambda position: -links[position])
+        clusters.append(
+            Cluster(members=[albums[position] for position in cluster_positions])
+        )
+    return clusters
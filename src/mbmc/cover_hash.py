@@ -0,0 +1,73 @@
+"""
+Perceptual hashes of cover art, to find albums with the same artwork across providers.
+"""
+
+from typing import Optional
+
+from PIL import Image
+
+from mbmc.providers.provider import Album
+
+HASH_WIDTH: int = 8
+HASH_BITS: int = HASH_WIDTH * HASH_WIDTH
+MAX_DISTANCE: int = 7
+"""maximum number of differing bits for two covers to count as the same artwork"""
+CHUNKS: int = MAX_DISTANCE + 1
+CHUNK_BITS: int = HASH_BITS // CHUNKS
+
+
+def difference_hash(image: Image.Image) -> Optional[int]:
+    """
+    64 bit dHash: whether each pixel of a 9x8 grayscale version is brighter than its right neighbour.
+    Returns None for plain images (like placeholders), which would match any other plain image.
+    """
+    small = image.convert("L").resize((HASH_WIDTH + 1, HASH_WIDTH), Image.Resampling.LANCZOS)
+    pixels = list(small.getdata())
+    value: int = 0
+    for row in range(HASH_WIDTH):
+        for column in range(HASH_WIDTH):
+            left = pixels[row * (HASH_WIDTH + 1) + column]
+            right = pixels[row * (HASH_WIDTH + 1) + column + 1]
+            value = (value << 1) | (left > right)
+    if value == 0 or value == (1 << HASH_BITS) - 1:
+        return None
+    return value
+
+
+def distance(first: int, second: int) -> int:
+    return (first ^ second).bit_count()
+
+
+def chunks(value: int) -> list[tuple[int, int]]:
+    mask = (1 << CHUNK_BITS) - 1
+    return [(chunk, (value >> (chunk * CHUNK_BITS)) & mask) for chunk in range(CHUNKS)]
+
+
+class CoverHashIndex:
+    """
+    Albums by cover hash, finding all within MAX_DISTANCE bits.
+    Hashes are split into MAX_DISTANCE + 1 chunks, so two hashes within the distance share at
+    least one identical chunk, and only albums sharing a chunk need to be compared.
+    """
+
+    def __init__(self) -> None:
+        self.buckets: dict[tuple[int, int], list[Album]] = {}
+
+    def add(self, album: Album) -> None:
+        if album.cover_hash is not None:
+            for key in chunks(album.cover_hash):
+                self.buckets.setdefault(key, []).append(album)
+
+    def search(self, album: Album) -> list[Album]:
+        """Indexed albums with the same artwork as the given album, excluding itself."""
+        if album.cover_hash is None:
+            return []
+        found: list[Album] = []
+        seen: set[int] = {id(album)}
+        for key in chunks(album.cover_hash):
+            for other in self.buckets.get(key, []):
+                if id(other) not in seen:
+                    seen.add(id(other))
+                    if distance(album.cover_hash, other.cover_hash) <= MAX_DISTANCE:
+                        found.append(other)
+        return found
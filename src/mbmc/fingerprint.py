@@ -0,0 +1,64 @@
+"""
+Match albums by their track durations, independent of their titles.
+A fingerprint is the tuple of track durations in milliseconds, with 0 for unknown durations.
+"""
+
+from typing import Optional
+
+from mbmc.providers.provider import Album
+
+TOLERANCE: int = 2000
+"""maximum difference in milliseconds of the durations of matching tracks"""
+MIN_KNOWN_TRACKS: int = 3
+"""tracks of known duration two fingerprints need in common to match, fewer are too ambiguous"""
+
+Fingerprint = tuple[int, ...]
+
+
+def durations(album: Album) -> Fingerprint:
+    tracks = sorted(album.tracks, key=lambda track: (track.disk_nr, track.track_nr))
+    return tuple(track.duration or 0 for track in tracks)
+
+
+def fingerprint(album: Album) -> Optional[Fingerprint]:
+    """The fingerprint of an album, if enough of its track durations are known."""
+    album_durations = durations(album)
+    if sum(1 for duration in album_durations if duration) < MIN_KNOWN_TRACKS:
+        return None
+    return album_durations
+
+
+def matches(first: Fingerprint, second: Fingerprint, min_known: int = MIN_KNOWN_TRACKS) -> bool:
+    """Whether all tracks known in both fingerprints (at least min_known) are within the tolerance."""
+    if len(first) != len(second):
+        return False
+    known: int = 0
+    for first_duration, second_duration in zip(first, second):
+        if first_duration and second_duration:
+            if abs(first_duration - second_duration) > TOLERANCE:
+                return False
+            known += 1
+    return known >= min_known
+
+
+class FingerprintIndex:
+    """Albums by fingerprint, only comparing albums with the same number of tracks."""
+
+    def __init__(self) -> None:
+        self.buckets: dict[int, list[tuple[Fingerprint, Album]]] = {}
+
+    def add(self, album: Album) -> None:
+        album_fingerprint = fingerprint(album)
+        if album_fingerprint is not None:
+            self.buckets.setdefault(len(album_fingerprint), []).append((album_fingerprint, album))
+
+    def search(self, album: Album) -> list[Album]:
+        """Indexed albums matching the fingerprint of the given album, excluding itself."""
+        album_fingerprint = fingerprint(album)
+        if album_fingerprint is None:
+            return []
+        return [
+            other
+            for other_fingerprint, other in self.buckets.get(len(album_fingerprint), [])
+            if other is not album and matches(album_fingerprint, other_fingerprint)
+        ]
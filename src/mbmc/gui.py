@@ -145,6 +145,7 @@ class CollectorApp(tk.Tk):
         )
         if new_q is not None:
             self.active_provider.query = new_q
+            self.active_provider.suggestions = []
             # refresh UI synchronously
             self.add_provider(self.active_provider, replace=False)
 
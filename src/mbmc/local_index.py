@@ -0,0 +1,331 @@
+"""
+Local MusicBrainz index, built from the JSON data dumps at
+https://data.metabrainz.org/pub/musicbrainz/data/json-dumps/
+
+Build it with ``python -m mbmc.local_index <index> --artist artist.tar.xz --release release.tar.xz``
+and use it with ``python -m mbmc --local-index <index> <artist>``.
+"""
+
+import json
+import sqlite3
+import tarfile
+import threading
+import zlib
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import IO, Iterator, Optional
+
+from tqdm import tqdm
+
+from mbmc.music_brainz import MbRelease, normalize_url
+
+SCHEMA: str = """
+create table if not exists artist (
+    id text primary key,
+    urls text not null
+) strict;
+create table if not exists release (
+    id text primary key,
+    record text not null,
+    tracks blob not null
+) strict;
+create table if not exists release_artist (
+    artist text not null,
+    release text not null,
+    unique(artist, release) on conflict ignore
+) strict;
+create table if not exists isrc (
+    isrc text not null,
+    release text not null,
+    unique(isrc, release) on conflict ignore
+) strict;
+create table if not exists url (
+    url text not null,
+    entity text not null,
+    id text not null,
+    unique(url, entity, id) on conflict ignore
+) strict;
+"""
+
+BATCH_SIZE: int = 10000
+
+
+def artist_credit_phrase(credits: list[dict]) -> str:
+    return "".join(credit["name"] + credit.get("joinphrase", "") for credit in credits)
+
+
+def url_relations(entity: dict) -> list[dict]:
+    return [
+        relation
+        for relation in entity.get("relations", [])
+        if relation.get("target-type") == "url" and "url" in relation
+    ]
+
+
+def release_to_record(release: dict) -> MbRelease:
+    return MbRelease(
+        id=release["id"],
+        title=release["title"],
+        artist=artist_credit_phrase(release.get("artist-credit", [])),
+        date=release.get("date") or None,
+        country=release.get("country") or None,
+        barcode=release.get("barcode") or None,
+        release_group=(release.get("release-group") or {}).get("id"),
+        front_cover=bool((release.get("cover-art-archive") or {}).get("front")),
+        media=tuple(
+            (medium.get("format"), int(medium.get("track-count", 0)))
+            for medium in release.get("media", [])
+        ),
+        urls=tuple(
+            normalize_url(relation["url"]["resource"])
+            for relation in url_relations(release)
+        ),
+    )
+
+
+def release_to_tracks(release: dict) -> list[tuple[int, int, str, str, int]]:
+    """Medium position, track position, title, artist credit and length of every track"""
+    return [
+        (
+            int(medium.get("position", 1)),
+            int(track.get("position", 0)),
+            track["recording"]["title"],
+            artist_credit_phrase(track["recording"].get("artist-credit", [])),
+            int(track.get("length") or 0),
+        )
+        for medium in release.get("media", [])
+        for track in medium.get("tracks", [])
+    ]
+
+
+def release_isrcs(release: dict) -> set[str]:
+    return {
+        isrc.upper()
+        for medium in release.get("media", [])
+        for track in medium.get("tracks", [])
+        for isrc in track["recording"].get("isrcs", [])
+    }
+
+
+def release_artists(release: dict) -> set[str]:
+    """All artists credited on the release or any of its tracks"""
+    credits = list(release.get("artist-credit", []))
+    for medium in release.get("media", []):
+        for track in medium.get("tracks", []):
+            credits.extend(track.get("artist-credit", []))
+    return {credit["artist"]["id"] for credit in credits if "artist" in credit}
+
+
+def open_dump(path: Path, entity: str) -> Iterator[IO[bytes]]:
+    """Open either a plain JSON lines file, or the entity file inside a dump archive."""
+    if tarfile.is_tarfile(path):
+        # Stream the archive, the dumps are far too large to seek around in
+        with tarfile.open(path, "r|*") as archive:
+            for member in archive:
+                if member.name == f"mbdump/{entity}":
+                    file = archive.extractfile(member)
+                    assert file is not None
+                    yield file
+                    return
+        raise FileNotFoundError(f"{path} does not contain mbdump/{entity}")
+    else:
+        with path.open("rb") as file:
+            yield file
+
+
+def read_dump(path: Path, entity: str) -> Iterator[dict]:
+    for file in open_dump(path, entity):
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def import_artists(db: sqlite3.Connection, path: Path) -> None:
+    artists: list[tuple[str, str]] = []
+    urls: list[tuple[str, str, str]] = []
+    for artist in tqdm(read_dump(path, "artist"), desc="Artists", unit=" artists"):
+        relations = url_relations(artist)
+        artists.append(
+            (
+                artist["id"],
+                json.dumps(
+                    [[relation["url"]["resource"], bool(relation.get("ended"))] for relation in relations]
+                ),
+            )
+        )
+        for relation in relations:
+            urls.append((normalize_url(relation["url"]["resource"]), "artist", artist["id"]))
+        if len(artists) >= BATCH_SIZE:
+            flush_artists(db, artists, urls)
+    flush_artists(db, artists, urls)
+
+
+def flush_artists(
+    db: sqlite3.Connection, artists: list[tuple[str, str]], urls: list[tuple[str, str, str]]
+) -> None:
+    db.executemany("insert or replace into artist (id, urls) values (?, ?)", artists)
+    db.executemany("insert into url (url, entity, id) values (?, ?, ?)", urls)
+    db.commit()
+    artists.clear()
+    urls.clear()
+
+
+def import_releases(db: sqlite3.Connection, path: Path) -> None:
+    releases: list[tuple[str, str, bytes]] = []
+    artists: list[tuple[str, str]] = []
+    urls: list[tuple[str, str, str]] = []
+    isrcs: list[tuple[str, str]] = []
+    for release in tqdm(read_dump(path, "release"), desc="Releases", unit=" releases"):
+        record = release_to_record(release)
+        releases.append(
+            (
+                record.id,
+                json.dumps([getattr(record, name) for name in MbRelease.__slots__]),
+                zlib.compress(json.dumps(release_to_tracks(release)).encode()),
+            )
+        )
+        artists.extend((artist, record.id) for artist in release_artists(release))
+        urls.extend((url, "release", record.id) for url in record.urls)
+        isrcs.extend((isrc, record.id) for isrc in release_isrcs(release))
+        if len(releases) >= BATCH_SIZE:
+            flush_releases(db, releases, artists, urls, isrcs)
+    flush_releases(db, releases, artists, urls, isrcs)
+
+
+def flush_releases(
+    db: sqlite3.Connection,
+    releases: list[tuple[str, str, bytes]],
+    artists: list[tuple[str, str]],
+    urls: list[tuple[str, str, str]],
+    isrcs: list[tuple[str, str]],
+) -> None:
+    db.executemany("insert or replace into release (id, record, tracks) values (?, ?, ?)", releases)
+    db.executemany("insert into release_artist (artist, release) values (?, ?)", artists)
+    db.executemany("insert into url (url, entity, id) values (?, ?, ?)", urls)
+    db.executemany("insert into isrc (isrc, release) values (?, ?)", isrcs)
+    db.commit()
+    releases.clear()
+    artists.clear()
+    urls.clear()
+    isrcs.clear()
+
+
+def build_index(index: Path, artist_dump: Optional[Path], release_dump: Optional[Path]) -> None:
+    db = sqlite3.connect(index)
+    db.executescript(SCHEMA)
+    if artist_dump is not None:
+        import_artists(db, artist_dump)
+    if release_dump is not None:
+        import_releases(db, release_dump)
+    db.close()
+
+
+class LocalIndex:
+    """Read access to an index built with build_index, safe to use from multiple threads."""
+
+    def __init__(self, path: Path):
+        if not path.exists():
+            raise FileNotFoundError(f"No local index at {path}")
+        self.path: Path = path
+        self.local = threading.local()
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if not hasattr(self.local, "db"):
+            self.local.db = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        return self.local.db
+
+    def get_artist(self, mb_id: str) -> dict:
+        """Artist in the format returned by musicbrainzngs, only containing url relationships"""
+        row = self.db.execute("select urls from artist where id = ?", (mb_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"Artist {mb_id} is not in the local index")
+        return {
+            "id": mb_id,
+            "url-relation-list": [
+                {"target": url, "ended": "true" if ended else "false"}
+                for url, ended in json.loads(row[0])
+            ],
+        }
+
+    def iter_releases(self, mb_id: str) -> Iterator[MbRelease]:
+        cursor = self.db.execute(
+            "select record from release join release_artist on release.id = release_artist.release "
+            "where release_artist.artist = ?",
+            (mb_id,),
+        )
+        for (record,) in cursor:
+            release = MbRelease(*json.loads(record))
+            release.media = tuple(tuple(medium) for medium in release.media)
+            release.urls = tuple(release.urls)
+            yield release
+
+    def get_release(self, mb_id: str) -> dict:
+        """Release with its tracks, in the format returned by musicbrainzngs"""
+        row = self.db.execute("select record, tracks from release where id = ?", (mb_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"Release {mb_id} is not in the local index")
+        record = MbRelease(*json.loads(row[0]))
+        media: dict[int, list[dict]] = {}
+        for medium, position, title, artist, length in json.loads(zlib.decompress(row[1])):
+            media.setdefault(medium, []).append(
+                {
+                    "position": str(position),
+                    "length": str(length),
+                    "recording": {"title": title, "artist-credit-phrase": artist},
+                }
+            )
+        return {
+            "id": mb_id,
+            "title": record.title,
+            "artist-credit-phrase": record.artist,
+            "date": record.date,
+            "country": record.country,
+            "barcode": record.barcode,
+            "medium-list": [
+                {"position": str(position), "track-list": tracks}
+                for position, tracks in sorted(media.items())
+            ],
+        }
+
+    def find_isrcs(self, isrcs: list[str]) -> dict[str, list[tuple[str, Optional[int]]]]:
+        """Releases containing a recording with each of the given ISRCs, with their track counts"""
+        releases: dict[str, list[tuple[str, Optional[int]]]] = {isrc: [] for isrc in isrcs}
+        for isrc in isrcs:
+            cursor = self.db.execute(
+                "select isrc.release, release.record from isrc "
+                "left join release on release.id = isrc.release where isrc.isrc = ?",
+                (isrc,),
+            )
+            for release, record in cursor:
+                track_count = None
+                if record is not None:
+                    track_count = sum(count for _, count in MbRelease(*json.loads(record)).media)
+                releases[isrc].append((release, track_count))
+        return releases
+
+    def find_url(self, url: str) -> tuple[list[str], list[str]]:
+        """Artists and releases linked to the given url"""
+        artists: list[str] = []
+        releases: list[str] = []
+        for entity, mb_id in self.db.execute(
+            "select entity, id from url where url = ?", (normalize_url(url),)
+        ):
+            (artists if entity == "artist" else releases).append(mb_id)
+        return artists, releases
+
+
+def main() -> int:
+    parser = ArgumentParser(description="Build a local MusicBrainz index from the JSON data dumps.")
+    parser.add_argument("index", help="Path of the index to create or update", type=Path)
+    parser.add_argument("--artist", help="artist dump (.tar.xz or JSON lines)", type=Path)
+    parser.add_argument("--release", help="release dump (.tar.xz or JSON lines)", type=Path)
+    args = parser.parse_args()
+    if args.artist is None and args.release is None:
+        parser.error("At least one of --artist and --release is required")
+    build_index(args.index, args.artist, args.release)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,15 +1,19 @@
-import re
 from multiprocessing.pool import ThreadPool
 from queue import Queue
+from threading import Event, Thread
 from typing import Optional
 
 from mbmc.gui import CollectorApp
 from mbmc.music_brainz import (
     get_artist,
     get_releases,
+    get_isrc_releases,
     find_url,
     normalize_url,
+    resolve_isrcs,
+    resolve_urls,
 )
+from mbmc.normalize import normalize_album
 from mbmc.prefetch import prefetch_provider
 from mbmc.providers.apple_music import AppleMusicProvider
 from mbmc.providers.bandcamp import BandcampProvider
@@ -40,12 +44,34 @@ PROVIDERS = [
     DiscogsProvider,
     MusicBrainzProvider,
 ]
+MAX_ISRC_CANDIDATES: int = 5
+"""releases sharing ISRCs to suggest at most, each of them has to be loaded"""
 
 
 def get_providers(
     mb_id: str, queue: Queue[str | tuple[str, int]], banned_urls: list[str], ignore: list[str]
 ) -> list[Provider]:
+    """
+    Prefetch all providers linked from the artist.
+    Providers start as soon as the artist urls are known, while the urls already linked to
+    releases are collected concurrently and added to the ignore set once available.
+    """
     artist = get_artist(mb_id)
+    ignore_set: set[str] = set(ignore)
+    ignore_complete = Event()
+
+    errors: list[Exception] = []
+
+    def collect_existing_urls() -> None:
+        try:
+            ignore_set.update(find_missing_releases(mb_id))
+        except Exception as error:
+            errors.append(error)
+        finally:
+            ignore_complete.set()
+
+    Thread(target=collect_existing_urls, daemon=True).start()
+
     relevant_urls: list[str] = []
     for url in artist.get("url-relation-list", []):
         if url["target"] not in banned_urls and url.get("ended", "false") != "true":
@@ -60,23 +86,20 @@ def get_providers(
 
     with ThreadPool(15) as pool:
         providers = pool.map(prefetch_provider, (
-            (provider_cls, links, queue, ignore)
+            (provider_cls, links, queue, ignore_set, ignore_complete)
             for provider_cls, links in pairings.items()
             if links
         ))
+    if errors:
+        # Without the linked urls every existing release would be asked again
+        raise errors[0]
     return providers
 
 
-def normalize_name(name: str) -> str:
-    return name.lower().strip()
-
-
 def find_missing_releases(mb_id: str) -> list[str]:
-    releases = get_releases(mb_id)
     result = []
-    for album in releases:
-        for url in album.get("url-relation-list", []):
-            result.append(normalize_url(url["target"]))
+    for release in get_releases(mb_id):
+        result.extend(release.urls)
     return result
 
 
@@ -150,42 +173,14 @@ def album_to_track_title(album: Album) -> tuple[str, list[str], int]:
     return title_str, titles, 0
 
 
-def inner_extract_featured(
-    artist: ArtistFormat, name: str
-) -> tuple[list[str | tuple[str, str]], str]:
-    extracted: list[str | tuple[str, str]]
-    if isinstance(artist, str):
-        extracted = [artist]
-    else:
-        extracted = artist.copy()
-    if "feat." in name.lower() or "ft." in name.lower():
-        main_artist, featured_part = re.split(r"f(?:ea)?t\.", name, flags=re.IGNORECASE, maxsplit=1)
-        if main_artist.endswith("("):
-            main_artist = main_artist[:-1].strip()
-            featured_part = featured_part.replace(")", "", 1).strip()
-        if "(" in featured_part and ")" in featured_part:
-            featured_part, addition = featured_part.split("(", 1)
-            main_artist += "(" + addition
-        featured_names = [n.strip() for n in featured_part.replace("&", ",").split(",")]
-        for feat_name in featured_names:
-            for entry in extracted:
-                entry_name = entry[0] if isinstance(entry, tuple) else entry
-                if normalize_name(entry_name) == normalize_name(feat_name):
-                    break
-            else:
-                if " feat. " in extracted:
-                    extracted.append(", ")
-                else:
-                    extracted.append(" feat. ")
-                extracted.append((feat_name, "unknown"))
-        return extracted, main_artist.strip()
-    return extracted, name
-
-
 def extract_featured(album: Album):
-    album.artist, album.title = inner_extract_featured(album.artist, album.title)
+    # Usually already done by the prefetch workers
+    normalize_album(album)
+    if album.featured[1] != album.title:
+        album.normalized_title = None
+    album.artist, album.title = album.featured
     for track in album.tracks:
-        track.artist, track.title = inner_extract_featured(track.artist, track.title)
+        track.artist, track.title = track.featured
 
 
 def album_to_album_artist(
@@ -302,7 +297,127 @@ def select_release_language(app: CollectorApp) -> Optional[str]:
     return selected.prompt
 
 
+def complete_albums(albums: list[Album]) -> None:
+    """Load the details of any chosen album that is still a stub."""
+    by_provider: dict[Provider, list[Album]] = {}
+    for album in albums:
+        by_provider.setdefault(album.provider, []).append(album)
+    for provider, provider_albums in by_provider.items():
+        provider.complete(provider_albums)
+
+
+def artist_urls(album: Album) -> list[str]:
+    """Urls of all artists credited on the album or its tracks"""
+    urls: list[str] = []
+    for credit in [album.artist] + [track.artist for track in album.tracks]:
+        if isinstance(credit, str):
+            continue
+        for entry in credit:
+            if isinstance(entry, tuple) and entry[1] != "unknown":
+                urls.append(entry[1])
+    return urls
+
+
+def resolve_artist_credits(albums: list[Album]) -> None:
+    """
+    Look up the artists credited on the albums in the background, so the artist
+    questions don't wait for MusicBrainz.
+    """
+
+    def resolve() -> None:
+        complete_albums(albums)
+        resolve_urls(url for album in albums for url in artist_urls(album))
+
+    Thread(target=resolve, daemon=True).start()
+
+
+def album_isrcs(albums: list[Album]) -> set[str]:
+    return {track.isrc.upper() for album in albums for track in album.tracks if track.isrc}
+
+
+def same_size(release_count: Optional[int], albums: list[Album]) -> bool:
+    """
+    Whether a release of the given track count has as many tracks as one of the albums, or as
+    they have ISRCs. A recording of a single also appears on the album, so containing all ISRCs
+    is not enough.
+    """
+    album_counts = {len(album.tracks) or album.track_count for album in albums}
+    return release_count is not None and (
+        release_count in album_counts or release_count == len(album_isrcs(albums))
+    )
+
+
+def isrc_matches(albums: list[Album]) -> tuple[list[str], list[str], dict[str, Optional[int]]]:
+    """
+    Ids of the releases containing recordings with all ISRCs of the given albums,
+    and of those containing only some of them, most shared ISRCs first, and their track counts.
+    """
+    isrcs = sorted(album_isrcs(albums))
+    if not isrcs:
+        return [], [], {}
+    shared: dict[str, int] = {}
+    track_counts: dict[str, Optional[int]] = {}
+    for releases in get_isrc_releases(isrcs).values():
+        for release, track_count in releases:
+            shared[release] = shared.get(release, 0) + 1
+            track_counts[release] = track_count
+    ranked = sorted(shared, key=lambda release: -shared[release])
+    return (
+        [release for release in ranked if shared[release] == len(isrcs)],
+        [release for release in ranked if shared[release] < len(isrcs)],
+        track_counts,
+    )
+
+
+def resolve_isrc_releases(albums: list[Album]) -> None:
+    """Look up the releases sharing ISRCs with the albums in the background, for match_existing_release."""
+
+    def resolve() -> None:
+        complete_albums(albums)
+        resolve_isrcs(sorted(album_isrcs(albums)))
+
+    Thread(target=resolve, daemon=True).start()
+
+
+def match_existing_release(
+    albums: list[Album], mb_provider: MusicBrainzProvider
+) -> tuple[Optional[Album], list[Album]]:
+    """
+    Find the existing release matching the picked albums, by barcode or by the ISRCs of
+    their tracks (which also finds releases not credited to the artist).
+    Returns the release if there is exactly one certain match of the same size,
+    and otherwise likely candidates.
+    """
+    # Stubs (i.e. of Spotify) only get their barcode with the details
+    complete_albums(albums)
+    barcode_matches = mb_provider.barcode_matches(albums)
+    if len(barcode_matches) == 1:
+        return barcode_matches[0], []
+    full, partial, track_counts = isrc_matches(albums)
+    if barcode_matches:
+        # Several releases share the barcode, the ISRCs may tell them apart
+        barcode_ids = {release.extra_data["mbid"] for release in barcode_matches}
+        confirmed = [mb_id for mb_id in full if mb_id in barcode_ids]
+    else:
+        confirmed = full
+    if len(confirmed) == 1:
+        track_count = track_counts.get(confirmed[0])
+        if track_count is None:
+            track_count = len(mb_provider.release_album(confirmed[0]).tracks)
+        if same_size(track_count, albums):
+            return mb_provider.release_album(confirmed[0]), []
+    # A single's recordings are on many compilations, only load the likeliest releases
+    ranked = sorted(full, key=lambda mb_id: not same_size(track_counts.get(mb_id), albums))
+    candidates = list(barcode_matches)
+    for mb_id in (ranked + partial)[:MAX_ISRC_CANDIDATES]:
+        album = mb_provider.release_album(mb_id)
+        if not any(album is candidate for candidate in candidates):
+            candidates.append(album)
+    return None, candidates
+
+
 def to_mb_release(albums: list[Album], app: CollectorApp) -> Optional[dict[str, str]]:
+    complete_albums(albums)
     PREVIOUS_MAPPINGS.clear()
     name: str = pick_reduction_option("Select album title", albums, album_to_title, app)
     if name is None:
@@ -369,10 +484,11 @@ def to_mb_release(albums: list[Album], app: CollectorApp) -> Optional[dict[str,
         result.update(artist_credit_to_mb_format(artist, f"{mb_name}.artist_credit"))
     counter = 0
     for album in albums:
-        for url_type in album.provider.url_types(album):
-            result[f"urls.{counter}.url"] = album.url
-            result[f"urls.{counter}.link_type"] = url_type
-            counter += 1
+        for url in (album.url, *album.alternate_urls):
+            for url_type in album.provider.url_types(album):
+                result[f"urls.{counter}.url"] = url
+                result[f"urls.{counter}.link_type"] = url_type
+                counter += 1
     if barcode:
         result["barcode"] = barcode
     result["type"] = release_type
@@ -413,6 +529,7 @@ def merge_mb_release(albums: list[Album], app: CollectorApp) -> Optional[tuple[s
             non_mb.append(album)
     assert mb_release is not None
     assert non_mb
+    complete_albums(albums)
     PREVIOUS_MAPPINGS.clear()
     track_layout = pick_reduction_option(
         "Select track layout", albums, album_to_track_layout, app
@@ -438,10 +555,11 @@ def merge_mb_release(albums: list[Album], app: CollectorApp) -> Optional[tuple[s
     result: dict[str, str] = {}
     counter = 0
     for album in albums:
-        for url_type in album.provider.url_types(album):
-            result[f"urls.{counter}.url"] = album.url
-            result[f"urls.{counter}.link_type"] = url_type
-            counter += 1
+        for url in (album.url, *album.alternate_urls):
+            for url_type in album.provider.url_types(album):
+                result[f"urls.{counter}.url"] = url
+                result[f"urls.{counter}.link_type"] = url_type
+                counter += 1
     if barcode:
         result["barcode"] = barcode
     if release_date.count("-") == 0:
@@ -1,14 +1,45 @@
 import re
+import sqlite3
+from concurrent.futures import Future
+from dataclasses import dataclass
 from functools import cache
-from typing import Optional
+from pathlib import Path
+from queue import Queue
+from threading import Lock, Thread
+from typing import Iterable, Iterator, Optional, TYPE_CHECKING
 
 import musicbrainzngs as mb
 
+from mbmc.cache import cached_batch
 from mbmc.constants import USER_AGENT
 
+if TYPE_CHECKING:
+    from mbmc.local_index import LocalIndex
+
 mb.set_useragent(*USER_AGENT.split("/"))
 
+ISRC_BATCH_SIZE: int = 20
+"""ISRCs per recording search, to keep the query well below the length limit"""
+
+URL_LOOKUP_THREADS: int = 4
+"""web lookups are serialized by the rate limit anyway, but local index lookups are not"""
+
 MATCHED_URLS: dict[str, Optional[str]] = {}
+PENDING_URLS: dict[str, Future] = {}
+PENDING_LOCK: Lock = Lock()
+URL_QUEUE: Queue[tuple[str, Future]] = Queue()
+URL_WORKERS: list[Thread] = []
+PENDING_ISRCS: dict[str, Future] = {}
+RELEASES_LOCK: Lock = Lock()
+LOCAL_INDEX: Optional["LocalIndex"] = None
+
+
+def use_local_index(path: Path) -> None:
+    """Answer artist, release and url lookups from a local index instead of the web service."""
+    global LOCAL_INDEX
+    from mbmc.local_index import LocalIndex
+
+    LOCAL_INDEX = LocalIndex(path)
 
 
 def normalize_url(url: str) -> str:
@@ -26,18 +57,64 @@ def normalize_url(url: str) -> str:
     return url
 
 
+def normalize_barcode(barcode: Optional[str]) -> Optional[str]:
+    """Barcode without formatting and leading zeros, as some providers omit or add them."""
+    if not barcode:
+        return None
+    digits = "".join(char for char in str(barcode) if char.isdigit()).lstrip("0")
+    return digits or None
+
+
 def find_url(url: str) -> Optional[str]:
     if url in MATCHED_URLS:
         return MATCHED_URLS[url]
+    with PENDING_LOCK:
+        pending = PENDING_URLS.get(url)
+    if pending is not None:
+        # Already being looked up in the background
+        return pending.result()
+    return lookup_url(url)
+
+
+def url_worker() -> None:
+    while True:
+        url, future = URL_QUEUE.get()
+        try:
+            future.set_result(lookup_url(url))
+        except Exception as e:
+            future.set_exception(e)
+
+
+def resolve_urls(urls: Iterable[str]) -> None:
+    """Start looking up the given urls in the background, find_url waits for these lookups."""
+    with PENDING_LOCK:
+        while len(URL_WORKERS) < URL_LOOKUP_THREADS:
+            URL_WORKERS.append(Thread(target=url_worker, daemon=True))
+            URL_WORKERS[-1].start()
+        for url in urls:
+            if url not in MATCHED_URLS and url not in PENDING_URLS:
+                PENDING_URLS[url] = Future()
+                URL_QUEUE.put((url, PENDING_URLS[url]))
+
+
+def lookup_url(url: str) -> Optional[str]:
     if url.startswith("https://musicbrainz.org/artist/"):
         mb_id = url.split("/")[-1]
         MATCHED_URLS[normalize_url(url)] = mb_id
         return mb_id
+    target: Optional[str] = None
+    if LOCAL_INDEX is not None:
+        artists, releases = LOCAL_INDEX.find_url(url)
+        if len(artists) == 1:
+            target = artists[0]
+        if len(releases) == 1:
+            target = releases[0]
+        MATCHED_URLS[normalize_url(url)] = target
+        return target
     try:
         result = mb.browse_urls(url, includes=["artist-rels", "release-rels"])
     except mb.ResponseError:
         result = None
-    target: Optional[str] = None
     if result:
         artists = result['url'].get("artist-relation-list", [])
         if len(artists) == 1:
@@ -49,8 +126,47 @@ def find_url(url: str) -> Optional[str]:
     return target
 
 
-def inner_get_releases(mb_id: str, various_artists: bool) -> list[dict]:
-    releases = []
+@dataclass(slots=True)
+class MbRelease:
+    """Compact record of a browsed release, holding only what is needed for matching."""
+
+    id: str
+    title: str
+    artist: str
+    date: Optional[str]
+    country: Optional[str]
+    barcode: Optional[str]
+    release_group: Optional[str]
+    front_cover: bool
+    media: tuple[tuple[Optional[str], int], ...]
+    """format and track count of each medium"""
+    urls: tuple[str, ...]
+    """normalized urls of all url relationships"""
+
+    @staticmethod
+    def from_ngs(release: dict) -> "MbRelease":
+        return MbRelease(
+            id=release["id"],
+            title=release["title"],
+            artist=release.get("artist-credit-phrase", ""),
+            date=release.get("date"),
+            country=release.get("country"),
+            barcode=release.get("barcode"),
+            release_group=release.get("release-group", {}).get("id"),
+            front_cover=release.get("cover-art-archive", {}).get("front") == "true",
+            media=tuple(
+                (medium.get("format"), int(medium.get("track-count", 0)))
+                for medium in release.get("medium-list", [])
+            ),
+            urls=tuple(
+                normalize_url(url["target"])
+                for url in release.get("url-relation-list", [])
+            ),
+        )
+
+
+def inner_get_releases(mb_id: str, various_artists: bool) -> Iterator[MbRelease]:
+    """Page through the releases of an artist, converting each page as it arrives."""
     limit = 100
     offset = 0
     extra = {"track_artist": mb_id} if various_artists else {"artist": mb_id}
@@ -58,42 +174,137 @@ def inner_get_releases(mb_id: str, various_artists: bool) -> list[dict]:
     while True:
         result = mb.browse_releases(
             **extra,
-            includes=[
-                "recordings",
-                "url-rels",
-                "recording-rels",
-                "release-rels",
-                "media",
-                "artist-credits",
-            ],
+            # Only what is needed for matching, tracks are loaded on demand via get_release
+            includes=["url-rels", "media", "artist-credits", "release-groups"],
             limit=limit,
             offset=offset,
         )
         batch = result.get("release-list", [])
-        releases.extend(batch)
-        if len(releases) >= result["release-count"]:
-            break
+        total: int = result["release-count"]
         offset += len(batch)
-    return releases
+        for release in batch:
+            yield MbRelease.from_ngs(release)
+        if not batch or offset >= total:
+            break
+
+
+def iter_releases(mb_id: str) -> Iterator[MbRelease]:
+    """Stream all releases of an artist, including releases it only has track credits on."""
+    if LOCAL_INDEX is not None:
+        sources = [LOCAL_INDEX.iter_releases(mb_id)]
+    else:
+        sources = [inner_get_releases(mb_id, various_artists) for various_artists in (False, True)]
+    seen: set[str] = set()
+    for source in sources:
+        for release in source:
+            if release.id in seen:
+                continue
+            seen.add(release.id)
+            for url in release.urls:
+                MATCHED_URLS[url] = release.id
+            yield release
+
+
+@cache
+def inner_get_all_releases(mb_id: str) -> list[MbRelease]:
+    return list(iter_releases(mb_id))
+
+
+def get_releases(mb_id: str) -> list[MbRelease]:
+    # Requested concurrently at startup, make sure the releases are only paged once
+    with RELEASES_LOCK:
+        return inner_get_all_releases(mb_id)
 
 
 @cache
-def get_releases(mb_id: str) -> list[dict]:
-    releases = inner_get_releases(mb_id, various_artists=False)
-    releases.extend(inner_get_releases(mb_id, various_artists=True))
+def get_release(mb_id: str) -> dict:
+    if LOCAL_INDEX is not None:
+        return LOCAL_INDEX.get_release(mb_id)
+    release = mb.get_release_by_id(
+        mb_id, includes=["recordings", "artist-credits", "url-rels"]
+    )["release"]
+    for url in release.get("url-relation-list", []):
+        MATCHED_URLS[normalize_url(url["target"])] = release["id"]
+    return release
+
+
+IsrcRelease = tuple[str, Optional[int]]
+"""id and track count (if known) of a release containing a recording"""
+
+
+@cached_batch
+def search_isrc_releases(isrcs: list[str]) -> list[list[IsrcRelease]]:
+    """Releases containing a recording with each ISRC, searching several at once."""
+    releases: dict[str, dict[str, Optional[int]]] = {isrc: {} for isrc in isrcs}
+    for start in range(0, len(isrcs), ISRC_BATCH_SIZE):
+        query = " OR ".join(f"isrc:{isrc}" for isrc in isrcs[start:start + ISRC_BATCH_SIZE])
+        offset = 0
+        while True:
+            result = mb.search_recordings(query=query, limit=100, offset=offset)
+            recordings = result.get("recording-list", [])
+            for recording in recordings:
+                track_counts = {
+                    release["id"]: release.get("medium-track-count")
+                    for release in recording.get("release-list", [])
+                }
+                for isrc in recording.get("isrc-list", []):
+                    if isrc in releases:
+                        releases[isrc].update(track_counts)
+            offset += len(recordings)
+            if not recordings or offset >= int(result.get("recording-count", 0)):
+                break
+    return [sorted(releases[isrc].items()) for isrc in isrcs]
+
+
+def lookup_isrcs(isrcs: list[str]) -> dict[str, list[IsrcRelease]]:
+    if LOCAL_INDEX is not None:
+        try:
+            return LOCAL_INDEX.find_isrcs(isrcs)
+        except sqlite3.OperationalError:
+            # Index built before ISRCs were imported
+            pass
+    return dict(zip(isrcs, search_isrc_releases(isrcs)))
+
+
+def isrc_worker(isrcs: list[str]) -> None:
+    try:
+        found = lookup_isrcs(isrcs)
+    except Exception as e:
+        with PENDING_LOCK:
+            futures = [PENDING_ISRCS.pop(isrc) for isrc in isrcs]
+        for future in futures:
+            future.set_exception(e)
+        return
+    for isrc in isrcs:
+        PENDING_ISRCS[isrc].set_result(found[isrc])
+
+
+def resolve_isrcs(isrcs: list[str]) -> None:
+    """Start looking up the releases of the given ISRCs in the background, get_isrc_releases waits for these."""
+    with PENDING_LOCK:
+        new = [isrc for isrc in isrcs if isrc not in PENDING_ISRCS]
+        for isrc in new:
+            PENDING_ISRCS[isrc] = Future()
+    if new:
+        Thread(target=isrc_worker, args=(new,), daemon=True).start()
 
-    for release in releases:
-        for url in release.get("url-relation-list", []):
-            MATCHED_URLS[normalize_url(url["target"])] = release["id"]
 
-    return releases
+def get_isrc_releases(isrcs: list[str]) -> dict[str, list[IsrcRelease]]:
+    """Releases containing a recording with each of the given ISRCs"""
+    resolve_isrcs(isrcs)
+    with PENDING_LOCK:
+        futures = {isrc: PENDING_ISRCS[isrc] for isrc in isrcs}
+    return {isrc: future.result() for isrc, future in futures.items()}
 
 
 @cache
 def get_artist(mb_id: str) -> dict:
-    artist = mb.get_artist_by_id(mb_id, includes=["url-rels", "release-groups"])[
-        "artist"
-    ]
+    if LOCAL_INDEX is not None:
+        artist = LOCAL_INDEX.get_artist(mb_id)
+    else:
+        artist = mb.get_artist_by_id(mb_id, includes=["url-rels", "release-groups"])[
+            "artist"
+        ]
     for url in artist.get("url-relation-list", []):
         MATCHED_URLS[normalize_url(url["target"])] = artist["id"]
     return artist
@@ -0,0 +1,77 @@
+"""
+Text processing of fetched albums, done once by the prefetch workers so the questions
+(title search, splitting off featured artists) don't have to do it on the GUI thread.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import TYPE_CHECKING
+
+from fuzzywuzzy import utils
+from transliterate import translit
+from transliterate.exceptions import LanguageDetectionError
+
+if TYPE_CHECKING:
+    from mbmc.providers.provider import Album, ArtistFormat
+
+Featured = tuple[list[str | tuple[str, str]], str]
+"""artist credit with the featured artists of the title added, and the title without them"""
+
+
+def transliterate_title(title: str) -> str:
+    try:
+        title = translit(title, reversed=True)
+    except LanguageDetectionError:
+        pass
+    return title.lower()
+
+
+def process_title(title: str) -> str:
+    """A title processed for fuzzy matching, like TitleIndex processes titles."""
+    return utils.full_process(transliterate_title(title), force_ascii=True)
+
+
+def normalize_name(name: str) -> str:
+    return name.lower().strip()
+
+
+def inner_extract_featured(artist: ArtistFormat, name: str) -> Featured:
+    extracted: list[str | tuple[str, str]]
+    if isinstance(artist, str):
+        extracted = [artist]
+    else:
+        extracted = artist.copy()
+    if "feat." in name.lower() or "ft." in name.lower():
+        main_artist, featured_part = re.split(r"f(?:ea)?t\.", name, flags=re.IGNORECASE, maxsplit=1)
+        if main_artist.endswith("("):
+            main_artist = main_artist[:-1].strip()
+            featured_part = featured_part.replace(")", "", 1).strip()
+        if "(" in featured_part and ")" in featured_part:
+            featured_part, addition = featured_part.split("(", 1)
+            main_artist += "(" + addition
+        featured_names = [n.strip() for n in featured_part.replace("&", ",").split(",")]
+        for feat_name in featured_names:
+            for entry in extracted:
+                entry_name = entry[0] if isinstance(entry, tuple) else entry
+                if normalize_name(entry_name) == normalize_name(feat_name):
+                    break
+            else:
+                if " feat. " in extracted:
+                    extracted.append(", ")
+                else:
+                    extracted.append(" feat. ")
+                extracted.append((feat_name, "unknown"))
+        return extracted, main_artist.strip()
+    return extracted, name
+
+
+def normalize_album(album: Album) -> None:
+    """Precompute the processed title and featured artists of an album and its loaded tracks."""
+    if album.normalized_title is None:
+        album.normalized_title = process_title(album.title)
+    if album.featured is None:
+        album.featured = inner_extract_featured(album.artist, album.title)
+    for track in album.tracks:
+        if track.featured is None:
+            track.featured = inner_extract_featured(track.artist, track.title)
@@ -2,6 +2,7 @@ import io
 import traceback
 import urllib.request
 from queue import Queue
+from threading import Event, Thread
 from typing import Optional
 
 from PIL import Image
@@ -10,8 +11,14 @@ from time import sleep
 
 from mbmc.cache import cached
 from mbmc.constants import USER_AGENT
+from mbmc.cover_hash import difference_hash
+from mbmc.normalize import normalize_album
+from mbmc.providers.music_brainz_provider import MusicBrainzProvider
 from mbmc.providers.provider import Provider, Album
 
+UPCOMING_QUESTIONS: int = 3
+"""number of questions (the current one included) to load album details for in advance"""
+
 
 @cached
 def get_thumbnail(url: str) -> Optional[bytes]:
@@ -32,6 +39,17 @@ def get_thumbnail(url: str) -> Optional[bytes]:
 
 
 
+@cached
+def get_cover_hash(url: str) -> Optional[int]:
+    data = get_thumbnail(url)
+    if data is None:
+        return None
+    try:
+        return difference_hash(Image.open(io.BytesIO(data)))
+    except:
+        return None
+
+
 def load_thumbnail(url: str | ImageFile) -> Optional[ImageFile]:
     if isinstance(url, ImageFile):
         return url
@@ -44,6 +62,37 @@ def load_thumbnail(url: str | ImageFile) -> Optional[ImageFile]:
         return None
 
 
+def edition_key(album: Album) -> tuple:
+    """Albums with the same key are identical editions, i.e. explicit and clean versions."""
+    durations = tuple(round((track.duration or 0) / 1000) for track in album.tracks)
+    return album.title.lower().strip(), album.release_date, len(album.tracks), durations
+
+
+def dedupe_editions(provider: Provider, albums: list[Album]) -> list[Album]:
+    """
+    Collapse identical editions into the first one listed, keeping the others' urls.
+    Stubs that may be editions of another album are loaded first, to compare their tracklists.
+    """
+    similar: dict[tuple, list[Album]] = {}
+    for album in albums:
+        key = (album.title.lower().strip(), album.release_date, len(album.tracks) or album.track_count)
+        similar.setdefault(key, []).append(album)
+    provider.complete([album for group in similar.values() if len(group) > 1 for album in group])
+    primaries: dict[tuple, Album] = {}
+    result: list[Album] = []
+    for album in albums:
+        if not album.tracks:
+            # Nothing to compare
+            result.append(album)
+            continue
+        primary = primaries.setdefault(edition_key(album), album)
+        if primary is album:
+            result.append(album)
+        elif album.url != primary.url:
+            primary.alternate_urls += (album.url,)
+    return result
+
+
 def thumbnail_worker(items: tuple[Album, Queue]):
     album, queue = items
     if album.thumbnail is not None:
@@ -52,21 +101,64 @@ def thumbnail_worker(items: tuple[Album, Queue]):
 
 
 def prefetch_provider(
-    input: tuple[type[Provider], set[str], Queue[str | tuple[str, int]], list[str]],
+    input: tuple[type[Provider], set[str], Queue[str | tuple[str, int]], set[str], Event],
 ) -> Provider:
-    provider_cls, links, queue, ignore = input
+    """
+    Fetch all albums of a provider, normalize their titles and load their thumbnails.
+    The ignore set may still be growing while fetching; it is complete once ignore_complete is set.
+    """
+    provider_cls, links, queue, ignore, ignore_complete = input
     provider = provider_cls()
     provider.message_queue = queue
     try:
         for url in links:
             provider.albums.extend(provider.fetch(url, ignore))
+        # Albums fetched before all existing urls were known are only removed now
+        ignore_complete.wait()
+        provider.albums = [album for album in provider.albums if album.url not in ignore]
+        if not isinstance(provider, MusicBrainzProvider):
+            provider.albums = dedupe_editions(provider, provider.albums)
+        for album in provider.albums:
+            normalize_album(album)
         queue.put(("Thumbnails", len(provider.albums)))
         # Only one at a time for better success rates, and this is usually not a bottleneck
         for album in provider.albums:
             if album.thumbnail is not None:
+                if isinstance(album.thumbnail, str):
+                    album.cover_hash = get_cover_hash(album.thumbnail)
                 album.thumbnail = load_thumbnail(album.thumbnail)
             queue.put("Thumbnails")
     except:
         traceback.print_exc()
         print("\n")
     return provider
+
+
+
+class DetailPrefetcher(Thread):
+    """
+    Loads the details of albums that are candidates for upcoming questions in the background,
+    so they are usually complete by the time they are picked.
+    """
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.requests: Queue[list[Album]] = Queue()
+
+    def request(self, albums: list[Album]) -> None:
+        self.requests.put(albums)
+
+    def run(self) -> None:
+        while True:
+            albums = self.requests.get()
+            # Only the most recent request matters, older questions have already been answered
+            while not self.requests.empty():
+                albums = self.requests.get()
+            by_provider: dict[Provider, list[Album]] = {}
+            for album in albums:
+                by_provider.setdefault(album.provider, []).append(album)
+            for provider, provider_albums in by_provider.items():
+                try:
+                    provider.complete(provider_albums)
+                except:
+                    traceback.print_exc()
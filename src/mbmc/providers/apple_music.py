@@ -2,24 +2,43 @@ import base64
 import datetime
 import json
 import re
-from functools import cache
-from typing import List
+from multiprocessing.pool import ThreadPool
+from typing import List, Optional
 
 import requests
 from bs4 import BeautifulSoup
 import applemusicpy
 
-from mbmc.cache import cached
+from mbmc.cache import cached_batch
 from mbmc.music_brainz import normalize_url
 from mbmc.providers._mb_link_types import (
     ARTIST_STREAMING,
     RELEASE_STREAMING,
 )
 from mbmc.providers.provider import Provider, Album, Track, ArtistFormat
+from mbmc.vault import vaulted
 
+ARTIST_VIEWS: list[str] = ["full-albums", "appears-on-albums", "live-albums", "singles"]
+ALBUM_BATCH_SIZE: int = 50
+ALBUM_PARAMETERS: dict[str, str] = {
+    "format[resources]": "map",
+    "include": "artists",
+    "include[songs]": "artists",
+    "fields[albums]": "name,releaseDate,upc,artwork,genreNames,artists,tracks",
+    "fields[songs]": "name,durationInMillis,trackNumber,discNumber,isrc,artists",
+    "fields[artists]": "name,url",
+}
 
-@cache
-def get_api_key() -> str:
+
+def jwt_claims(jwt: str) -> dict:
+    payload = jwt.split(".")[1]
+    while len(payload) % 4 != 0:
+        payload += "="
+    return json.loads(base64.urlsafe_b64decode(payload).decode("utf-8"))
+
+
+@vaulted
+def get_api_key() -> tuple[str, float]:
     initial: str = requests.get("https://music.apple.com/us/search?term=beatles").text
     soup = BeautifulSoup(initial, "html.parser")
     results = soup.find_all("script", attrs={"type": "module", "crossorigin": True})
@@ -28,12 +47,9 @@ def get_api_key() -> str:
     script = requests.get(f"https://music.apple.com{script_url}").text
     for match in re.finditer(r'[a-zA-Z]+\s*=\s*"(ey.+?)"', script):
         jwt = match.group(1)
-        cap = jwt.split(".")[1]
-        while len(cap) % 4 != 0:
-            cap += "="
-        capabilities = json.loads(base64.b64decode(cap, validate=False).decode("utf-8"))
+        capabilities = jwt_claims(jwt)
         if capabilities["iss"] == "AMPWebPlay":
-            return jwt
+            return jwt, capabilities["exp"]
     raise RuntimeError("Could not find AMPWebPlay JWT in script")
 
 
@@ -43,10 +59,11 @@ class PatchedAppleMusicClient(applemusicpy.AppleMusic):
         self.root = "https://amp-api.music.apple.com/v1/"
 
     def generate_token(self, session_length):
-        self.token_valid_until = datetime.datetime.now() + datetime.timedelta(
-            hours=session_length
-        )
         self.token_str = get_api_key()
+        self.token_valid_until = min(
+            datetime.datetime.now() + datetime.timedelta(hours=session_length),
+            datetime.datetime.fromtimestamp(jwt_claims(self.token_str)["exp"]),
+        )
 
     def _auth_headers(self):
         headers = super()._auth_headers()
@@ -63,25 +80,19 @@ class PatchedAppleMusicClient(applemusicpy.AppleMusic):
             views="appears-on-albums,full-albums,live-albums,singles",
         )
 
-    def album(self, album_id, storefront="us", l=None, include=None):
-        return self._get_resource(
-            album_id,
-            "albums",
-            storefront=storefront,
-            l=l,
-            **{
-                "fields[artists]": "name,url",
-                "format[resources]": "map",
-                "include": "artists",
-                "include[songs]": "artists,composers,albums",
-            },
+    def albums(self, album_ids, storefront="us", l=None, include=None):
+        return self._get_multiple_resources(
+            album_ids, "albums", storefront=storefront, l=l, **ALBUM_PARAMETERS
         )
 
+    def next_page(self, item: dict, **kwargs) -> dict:
+        return self._get(self.root.rsplit("/", 2)[0] + item["next"], **kwargs)
+
     def collect_items(self, item) -> list:
         results = [i["attributes"] for i in item["data"] if "attributes" in i]
         current_item: dict = item
         while "next" in current_item:
-            current_item = self._get(self.root.rsplit("/", 2)[0] + current_item["next"])
+            current_item = self.next_page(current_item)
             results.extend(i["attributes"] for i in current_item["data"])
         return results
 
@@ -99,9 +110,15 @@ class AppleMusicProvider(Provider):
             artists.append((Provider._(artist["name"]), normalize_url(artist["url"])))
         return artists
 
-    @cached
-    def get_album(self, album_id: str) -> Album:
-        resources = self.client.album(album_id)["resources"]
+    def to_album(self, album_id: str, resources: dict) -> Album:
+        album = resources["albums"][album_id]
+        track_page = album["relationships"]["tracks"]
+        track_refs = list(track_page["data"])
+        while "next" in track_page:
+            track_page = self.client.next_page(track_page, **ALBUM_PARAMETERS)
+            track_refs.extend(track_page["data"])
+            for resource_type, items in track_page.get("resources", {}).items():
+                resources.setdefault(resource_type, {}).update(items)
         tracks = [
             Track(
                 title=self._(track["attributes"]["name"]),
@@ -109,12 +126,14 @@ class AppleMusicProvider(Provider):
                 duration=track["attributes"].get("durationInMillis"),
                 track_nr=track["attributes"]["trackNumber"],
                 disk_nr=track["attributes"].get("discNumber", 1),
+                isrc=track["attributes"].get("isrc"),
                 provider=self,
             )
-            for track in resources["songs"].values()
+            for track in (
+                resources["songs"][ref["id"]] for ref in track_refs if ref["type"] == "songs"
+            )
         ]
         tracks.sort(key=lambda x: (x.disk_nr, x.track_nr))
-        _, album = resources["albums"].popitem()
         genres: list[str] = album["attributes"].get("genreNames", [])
         genres = [genre.lower() for genre in genres]
         if "music" in genres:
@@ -135,27 +154,55 @@ class AppleMusicProvider(Provider):
             provider=self,
         )
 
-    def fetch(self, url: str, ignore: list[str]) -> list[Album]:
+    def to_stub(self, album: dict) -> Album:
+        """Convert the attributes of an album in an artist view, without tracks."""
+        return Album(
+            title=self._(album["name"].replace(" - EP", "").replace(" - Single", "")),
+            artist=self._(album["artistName"]),
+            release_date=album.get("releaseDate", ""),
+            tracks=[],
+            track_count=album.get("trackCount"),
+            upn=album.get("upc"),
+            url=f"https://music.apple.com/album/{album['url'].split('/')[-1]}",
+            thumbnail=album["artwork"]["url"].replace("{w}x{h}", "640x640"),
+            extra_data={"id": album["url"].split("/")[-1]},
+            stub=True,
+            provider=self,
+        )
+
+    @cached_batch
+    def get_albums(self, album_ids: list[str]) -> list[Optional[Album]]:
+        albums: list[Optional[Album]] = []
+        for start in range(0, len(album_ids), ALBUM_BATCH_SIZE):
+            resources = self.client.albums(album_ids[start:start + ALBUM_BATCH_SIZE])["resources"]
+            albums.extend(
+                self.to_album(album_id, resources) if album_id in resources.get("albums", {}) else None
+                for album_id in album_ids[start:start + ALBUM_BATCH_SIZE]
+            )
+        return albums
+
+    def fetch(self, url: str, ignore: set[str]) -> list[Album]:
         artist = self.client.artist(url.split("/")[-1])
         artist: dict = artist["data"][0]
-        albums = self.client.collect_items(artist["views"]["full-albums"])
-        albums.extend(self.client.collect_items(artist["views"]["appears-on-albums"]))
-        albums.extend(self.client.collect_items(artist["views"]["live-albums"]))
-        albums.extend(self.client.collect_items(artist["views"]["singles"]))
+        with ThreadPool(len(ARTIST_VIEWS)) as pool:
+            views = pool.map(
+                self.client.collect_items, (artist["views"][view] for view in ARTIST_VIEWS)
+            )
+        albums = [album for view in views for album in view]
         finalized: list[Album] = []
         self.set_total_items(len(albums))
         for base_album in albums:
-            if normalize_url(base_album["url"]) in ignore:
-                self.finish_item()
-                continue
-            album = self.get_album(base_album["url"].split("/")[-1])
-            album.provider = self
-            for track in album.tracks:
-                track.provider = self
-            finalized.append(album)
+            if normalize_url(base_album["url"]) not in ignore:
+                finalized.append(self.to_stub(base_album))
             self.finish_item()
         return finalized
 
+    def load_details(self, albums: list[Album]) -> None:
+        details = self.get_albums([album.extra_data["id"] for album in albums])
+        for album, detail in zip(albums, details):
+            if detail is not None:
+                album.fill_details(detail)
+
     @staticmethod
     def relevant(url: str) -> bool:
         return "music.apple.com" in url and "/artist/" in url
@@ -1,11 +1,15 @@
-import re
+import json
+from datetime import datetime
 from enum import Enum
-from typing import List
+from multiprocessing.pool import ThreadPool
+from typing import List, Optional
+from urllib.parse import urljoin
 
 import bandcamp_lib as bc
 import requests
+from bs4 import BeautifulSoup
 
-from mbmc.cache import cached
+from mbmc.cache import cached, get_canonical_url, store_canonical_url
 from mbmc.music_brainz import normalize_url
 from mbmc.providers._mb_link_types import (
     ARTIST_BANDCAMP,
@@ -15,6 +19,8 @@ from mbmc.providers._mb_link_types import (
 )
 from mbmc.providers.provider import Provider, Album, Track
 
+DETAIL_THREADS: int = 4
+
 
 class AlbumType(Enum):
     Streamable = "streamable"
@@ -22,89 +28,135 @@ class AlbumType(Enum):
     Purchasable = "purchasable"
 
 
+def parse_release_date(date: str) -> str:
+    return f"{datetime.strptime(date, '%d %b %Y %H:%M:%S %Z'):%Y-%m-%d}"
+
+
+def get_release_urls(band_url: str) -> dict[str, str]:
+    """Map the item ids of an artist's releases (like album-123) to their page urls."""
+    req = requests.get(f"{band_url}/music")
+    req.raise_for_status()
+    soup = BeautifulSoup(req.text, "html.parser")
+    urls: dict[str, str] = {}
+    for item in soup.select("li[data-item-id]"):
+        link = item.find("a", href=True)
+        if link:
+            urls[item["data-item-id"]] = urljoin(band_url, link["href"])
+    # Releases past the initially rendered ones are only embedded as JSON
+    grid = soup.find(id="music-grid")
+    if grid and grid.get("data-client-items"):
+        for item in json.loads(grid["data-client-items"]):
+            urls[f"{item['type']}-{item['id']}"] = urljoin(band_url, item["page_url"])
+    return urls
+
+
 class BandcampProvider(Provider):
     def __init__(self) -> None:
         super().__init__("Bandcamp")
 
     @cached
-    def get_album(self, band_url: str, band_id: int, album_id: int, item_type: bc.ArtistDiscographyEntryType) -> Album:
-        if item_type == bc.ArtistDiscographyEntryType.Album:
-            album = bc.fetch_album_sync(band_id, album_id)
-        else:
-            album = bc.fetch_track_sync(band_id, album_id)
+    def get_album(self, band_url: str, album_url: str) -> Album:
+        """Parse a release from the data embedded in its page, needing only a single request."""
+        req = requests.get(album_url)
+        req.raise_for_status()
+        soup = BeautifulSoup(req.text, "html.parser")
+        tralbum: dict = json.loads(soup.find("script", attrs={"data-tralbum": True})["data-tralbum"])
+        ld_json = soup.find("script", attrs={"type": "application/ld+json"})
+        linked_data: dict = json.loads(ld_json.string) if ld_json else {}
+        band_name: str = linked_data.get("publisher", {}).get("name") or tralbum["artist"]
         artist_name = [
             (
                 self._(name.strip()),
                 (
                     normalize_url(band_url)
-                    if name.strip().lower() in album.band.name.lower()
+                    if name.strip().lower() in band_name.lower()
                     else "unknown"
                 ),
             )
-            for name in (album.album_artist or album.band.name).split(",")
+            for name in (tralbum.get("artist") or band_name).split(",")
         ]
         tracks = [
             Track(
-                title=self._(track.title),
+                title=self._(track["title"]),
                 artist=artist_name,
-                duration=int(track.duration * 1000) if track.duration is not None else None,
-                track_nr=track.track_number or 1,  # Singles have no track number
+                duration=int(track["duration"] * 1000) if track.get("duration") is not None else None,
+                track_nr=track.get("track_num") or 1,  # Singles have no track number
                 provider=self,
             )
-            for track in album.tracks
+            for track in tralbum["trackinfo"]
         ]
         if len(tracks) == 1:
             # Bandcamp sometimes spits out interesting track numbers for singles, see
             # https://ranarvegr.bandcamp.com/track/ko-lga-16
             tracks[0].track_nr = 1
         type_ = AlbumType.Purchasable
-        if all(track.is_streamable for track in album.tracks):
+        if all(track.get("file") for track in tralbum["trackinfo"]):
             type_ = AlbumType.Streamable
-        if album.free_download:
+        if tralbum.get("freeDownloadPage"):
             type_ = AlbumType.Downloadable
-        genres: list[str] = []
-        for tag in album.tags:
-            if not tag.is_location:
-                genres.append(tag.normalized_name)
-        req = requests.get(album.url)
-        req.raise_for_status()
-        page_content = req.text
-        raw_upc = re.search(r"&quot;upc&quot;:&quot;([0-9]+)&quot;", page_content)
-        upc = None
-        if raw_upc:
-            upc = raw_upc.group(1)
+        keywords = linked_data.get("keywords", [])
+        if isinstance(keywords, str):
+            keywords = keywords.split(",")
+        location = linked_data.get("publisher", {}).get("foundingLocation", {}).get("name", "")
+        location_parts = {part.strip().lower() for part in location.split(",")}
+        genres: list[str] = [
+            keyword.strip().lower()
+            for keyword in keywords
+            if keyword.strip().lower() not in location_parts
+        ]
+        release_date = (
+            tralbum.get("album_release_date")
+            or tralbum["current"].get("release_date")
+            or linked_data.get("datePublished")
+        )
         return Album(
-            title=self._(album.title),
+            title=self._(tralbum["current"]["title"]),
             artist=artist_name,
-            release_date=f"{album.release_date:%Y-%m-%d}",
+            release_date=parse_release_date(release_date) if release_date else "Unknown",
             tracks=tracks,
-            url=normalize_url(album.url),
-            thumbnail=album.image.get_with_resolution(bc.ImageResolution.Px420),
+            url=normalize_url(tralbum.get("url") or album_url),
             genre=genres,
-            upn=upc,
+            upn=tralbum["current"].get("upc") or None,
             provider=self,
             extra_data={"type": type_},
         )
 
-    def fetch(self, url: str, ignore: list[str]) -> list[Album]:
+    def fetch(self, url: str, ignore: set[str]) -> list[Album]:
         artist: bc.Artist = bc.artist_from_url_sync(url)
+        release_urls = get_release_urls(url)
         finalized: list[Album] = []
         self.set_total_items(len(artist.discography))
-        for album_entry in artist.discography:
-            album = self.get_album(
-                band_url=url,
-                band_id=artist.id,
-                album_id=album_entry.id,
-                item_type=album_entry.item_type,
-            )
-            if album.url in ignore:
+
+        def load(album_entry: bc.ArtistDiscographyEntry) -> Optional[Album]:
+            item_type = "album" if album_entry.item_type == bc.ArtistDiscographyEntryType.Album else "track"
+            item_id = f"{item_type}-{album_entry.id}"
+            # Skip releases known to be ignored without fetching their details
+            if get_canonical_url(self.name, item_id) in ignore:
+                return None
+            album_url = release_urls.get(item_id)
+            if album_url is not None and normalize_url(album_url) in ignore:
+                return None
+            if album_url is None:
+                # Not listed on the music page (i.e. it redirects to the only release)
+                if album_entry.item_type == bc.ArtistDiscographyEntryType.Album:
+                    album_url = bc.fetch_album_sync(artist.id, album_entry.id).url
+                else:
+                    album_url = bc.fetch_track_sync(artist.id, album_entry.id).url
+            album = self.get_album(band_url=url, album_url=album_url)
+            store_canonical_url(self.name, item_id, album.url)
+            album.thumbnail = album_entry.image.get_with_resolution(bc.ImageResolution.Px420)
+            return album
+
+        with ThreadPool(DETAIL_THREADS) as pool:
+            for album in pool.imap(load, artist.discography):
+                if album is None or album.url in ignore:
+                    self.finish_item()
+                    continue
+                album.provider = self
+                for track in album.tracks:
+                    track.provider = self
+                finalized.append(album)
                 self.finish_item()
-                continue
-            album.provider = self
-            for track in album.tracks:
-                track.provider = self
-            finalized.append(album)
-            self.finish_item()
         return finalized
 
     @staticmethod
@@ -1,7 +1,7 @@
-from time import sleep
+from multiprocessing.pool import ThreadPool
 from typing import List
 
-from deezer import Client
+from deezer import Artist, Client
 
 from mbmc.cache import cached
 from mbmc.music_brainz import normalize_url
@@ -10,31 +10,49 @@ from mbmc.providers._mb_link_types import (
     RELEASE_FREE_STREAMING,
 )
 from mbmc.providers.provider import Provider, Album, Track
+from mbmc.ratelimit import RateLimiter
+
+DETAIL_THREADS: int = 8
+
+
+class ThrottledClient(Client):
+    """Deezer client staying within the documented quota of 50 requests per 5 seconds."""
+
+    limiter = RateLimiter(calls=50, period=5)
+
+    def request(self, *args, **kwargs):
+        self.limiter.wait()
+        return super().request(*args, **kwargs)
 
 
 class DeezerProvider(Provider):
     def __init__(self):
         super().__init__("Deezer")
-        self.client = Client()
+        self.client = ThrottledClient()
+
+    @staticmethod
+    def artist_url(artist: Artist) -> str:
+        return f"https://www.deezer.com/artist/{artist.id}"
 
     @cached
-    def get_album(self, album_id: str) -> Album:
+    def get_full_album(self, album_id: str) -> Album:
         album = self.client.get_album(int(album_id))
-        sleep(0.5)  # Avoid hitting rate limits
+        # The tracklist embedded in the album lacks disc numbers, positions and ISRCs
         tracks = [
             Track(
                 title=self._(track.title),
-                artist=[(self._(track.artist.name), normalize_url(track.artist.link))],
+                artist=[(self._(track.artist.name), self.artist_url(track.artist))],
                 duration=track.duration * 1000,
                 track_nr=track.track_position,
                 disk_nr=track.disk_number,
+                isrc=track.isrc or None,
                 provider=self,
             )
             for track in album.get_tracks()
         ]
         return Album(
             title=self._(album.title),
-            artist=[(self._(album.artist.name), normalize_url(album.artist.link))],
+            artist=[(self._(album.artist.name), self.artist_url(album.artist))],
             release_date=f"{album.release_date:%Y-%m-%d}",
             tracks=tracks,
             url=normalize_url(album.link),
@@ -44,22 +62,25 @@ class DeezerProvider(Provider):
             provider=self,
         )
 
-
-    def fetch(self, url: str, ignore: list[str]) -> list[Album]:
+    def fetch(self, url: str, ignore: set[str]) -> list[Album]:
         artist = self.client.get_artist(int(url.split("/")[-1]))
         finalized: list[Album] = []
         raw_albums = list(artist.get_albums())
         self.set_total_items(len(raw_albums))
+        album_ids: list[str] = []
         for album in raw_albums:
             if normalize_url(album.link) in ignore:
                 self.finish_item()
                 continue
-            album = self.get_album(album.id)
-            album.provider = self
-            for track in album.tracks:
-                track.provider = self
-            finalized.append(album)
-            self.finish_item()
+            album_ids.append(str(album.id))
+        # Concurrency is bounded by the client's rate limiter
+        with ThreadPool(DETAIL_THREADS) as pool:
+            for album in pool.imap(self.get_full_album, album_ids):
+                album.provider = self
+                for track in album.tracks:
+                    track.provider = self
+                finalized.append(album)
+                self.finish_item()
         return finalized
 
     @staticmethod
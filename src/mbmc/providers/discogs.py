@@ -1,7 +1,13 @@
-from typing import List
+import os
+from multiprocessing.pool import ThreadPool
+from threading import Lock
+from time import monotonic, sleep
+from typing import List, Optional
 
 import discogs_client
 from discogs_client import Master, Track as DCTrack, Release as DCRelease
+from discogs_client.fetchers import RequestsFetcher, UserTokenRequestsFetcher
+from requests import Response
 
 from mbmc.cache import cached
 from mbmc.constants import USER_AGENT
@@ -9,6 +15,11 @@ from mbmc.music_brainz import normalize_url
 from mbmc.providers._mb_link_types import ARTIST_DISCOGS, RELEASE_DISCOGS
 from mbmc.providers.provider import Provider, Album, Track
 
+RATE_LIMIT_WINDOW: float = 60.0
+RATE_LIMIT_RESERVE: int = 2
+"""requests kept in reserve before pacing starts"""
+DETAIL_THREADS: int = 4
+
 
 def minutes_to_milliseconds(minutes: str) -> int:
     parts = minutes.split(":")
@@ -21,10 +32,70 @@ def minutes_to_milliseconds(minutes: str) -> int:
     return 0
 
 
+class AdaptiveThrottle:
+    """
+    Paces requests using the rate limit headers of the last response.
+    The remaining requests of the moving one-minute window are used up freely, after that
+    requests are spaced out to the sustained rate, staying just below the limit.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.limit: int = 25  # unauthenticated limit, until a response reports the real one
+        self.remaining: int = 25
+        self.next_request: float = 0.0
+
+    def wait(self) -> None:
+        with self.lock:
+            now = monotonic()
+            if self.next_request > now:
+                sleep(self.next_request - now)
+                now = self.next_request
+            interval = 0.0 if self.remaining > RATE_LIMIT_RESERVE else RATE_LIMIT_WINDOW / self.limit
+            self.next_request = now + interval
+            # Assume this request is counted, until its response reports otherwise
+            self.remaining -= 1
+
+    def update(self, response: Response) -> None:
+        with self.lock:
+            if "X-Discogs-Ratelimit" in response.headers:
+                self.limit = int(response.headers["X-Discogs-Ratelimit"])
+            if "X-Discogs-Ratelimit-Remaining" in response.headers:
+                self.remaining = int(response.headers["X-Discogs-Ratelimit-Remaining"])
+            elif "X-Discogs-Ratelimit-Used" in response.headers:
+                self.remaining = self.limit - int(response.headers["X-Discogs-Ratelimit-Used"])
+            if response.status_code == 429:
+                self.remaining = 0
+
+
+THROTTLE = AdaptiveThrottle()
+
+
+class ThrottledFetcher(RequestsFetcher):
+    def request(self, method, url, data, headers, params=None):
+        THROTTLE.wait()
+        response = super().request(method, url, data, headers, params)
+        THROTTLE.update(response)
+        return response
+
+
+class ThrottledUserTokenFetcher(UserTokenRequestsFetcher):
+    def request(self, method, url, data, headers, params=None):
+        THROTTLE.wait()
+        response = super().request(method, url, data, headers, params)
+        THROTTLE.update(response)
+        return response
+
+
 class DiscogsProvider(Provider):
     def __init__(self):
         super().__init__("Discogs")
-        self.client = discogs_client.Client(USER_AGENT)
+        # Authenticated requests get a higher rate limit
+        user_token: Optional[str] = os.environ.get("DISCOGS_USER_TOKEN")
+        self.client = discogs_client.Client(USER_AGENT, user_token=user_token)
+        self.client._fetcher = (
+            ThrottledUserTokenFetcher(user_token) if user_token else ThrottledFetcher()
+        )
 
     @staticmethod
     def item_to_artist(item: DCTrack | DCRelease) -> List[tuple[str, str]]:
@@ -61,10 +132,11 @@ class DiscogsProvider(Provider):
             provider=self,
         )
 
-    def fetch(self, url: str, ignore: list[str]) -> list[Album]:
+    def fetch(self, url: str, ignore: set[str]) -> list[Album]:
         artist = self.client.artist(url.split("/")[-1])
         finalized: list[Album] = []
         self.set_total_items(len(artist.releases))
+        release_ids: list[str] = []
         for release in artist.releases:
             if isinstance(release, Master):
                 self.finish_item()
@@ -72,12 +144,15 @@ class DiscogsProvider(Provider):
             if normalize_url(release.url) in ignore:
                 self.finish_item()
                 continue
-            release = self.get_release(release.id)
-            release.provider = self
-            for track in release.tracks:
-                track.provider = self
-            finalized.append(release)
-            self.finish_item()
+            release_ids.append(release.id)
+        # Pacing is left to the throttle, the pool only keeps requests in flight
+        with ThreadPool(DETAIL_THREADS) as pool:
+            for release in pool.imap(self.get_release, release_ids):
+                release.provider = self
+                for track in release.tracks:
+                    track.provider = self
+                finalized.append(release)
+                self.finish_item()
         return finalized
 
     @staticmethod
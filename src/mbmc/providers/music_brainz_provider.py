@@ -1,34 +1,97 @@
 from typing import List, Optional
 
-import musicbrainzngs as mb
-
-from mbmc.cache import cached
-from mbmc.music_brainz import get_releases
+import mbmc.music_brainz
+from mbmc.music_brainz import get_releases, get_release, normalize_barcode, MbRelease
 from mbmc.providers.provider import Provider, Album, Track
 
+COVER_ART_ARCHIVE: str = "https://coverartarchive.org"
+
 
-@cached
-def get_cover_art(mb_id: str) -> Optional[str]:
-    try:
-        cover_art = mb.get_image_list(mb_id)
-        for cover in cover_art["images"]:
-            if cover.get("front", False):
-                return cover.get("thumbnails", {}).get("small", None)
-    except:
-        return None
+def get_cover_art(release: MbRelease) -> Optional[str]:
+    """
+    Build the Cover Art Archive thumbnail url for a release without querying the archive.
+    Falls back to the release group front image if the release itself has no front cover.
+    Missing artwork is only detected when downloading the thumbnail, which is cached.
+    """
+    if release.front_cover:
+        return f"{COVER_ART_ARCHIVE}/release/{release.id}/front-250"
+    if release.release_group:
+        return f"{COVER_ART_ARCHIVE}/release-group/{release.release_group}/front-250"
     return None
 
 
 class MusicBrainzProvider(Provider):
     def __init__(self):
         super().__init__("MusicBrainz")
+        self.barcodes: dict[str, list[Album]] = {}
 
-    def fetch(self, url: str, _ignore: list[str]) -> list[Album]:
+    def fetch(self, url: str, _ignore: set[str]) -> list[Album]:
         releases = get_releases(url.split("/")[-1])
         finalized: list[Album] = []
         self.set_total_items(len(releases))
         for release in releases:
-            tracks = [
+            thumbnail = get_cover_art(release)
+            extra_info: Optional[str] = None
+            if len(release.media) >= 1:
+                extra_info = f"({release.media[0][0] or 'Unknown Format'})"
+            album = Album(
+                title=self._(release.title),
+                url=f"https://musicbrainz.org/release/{release.id}",
+                artist=release.artist,
+                release_date=release.date or "Unknown",
+                tracks=[],
+                track_count=sum(track_count for _, track_count in release.media),
+                stub=True,
+                extra_data={"mbid": release.id, "release_country": release.country},
+                thumbnail=thumbnail,
+                upn=release.barcode,
+                extra_info=extra_info,
+                provider=self,
+            )
+            barcode = normalize_barcode(release.barcode)
+            if barcode is not None:
+                self.barcodes.setdefault(barcode, []).append(album)
+            finalized.append(album)
+            self.finish_item()
+        if mbmc.music_brainz.LOCAL_INDEX is not None:
+            # Tracks are cheap to load from the local index, so they can be matched right away
+            self.complete(finalized)
+        return finalized
+
+    def barcode_matches(self, albums: list[Album]) -> list[Album]:
+        """Releases sharing a barcode with any of the given albums."""
+        matches: list[Album] = []
+        for album in albums:
+            for release in self.barcodes.get(normalize_barcode(album.upn), []):
+                if not any(release is match for match in matches):
+                    matches.append(release)
+        return matches
+
+    def release_album(self, mb_id: str) -> Album:
+        """The album of a release, which may not be credited to the artist, with its tracks."""
+        for album in self.albums:
+            if album.extra_data.get("mbid") == mb_id:
+                return album
+        release = get_release(mb_id)
+        album = Album(
+            title=self._(release.get("title", "")),
+            url=f"https://musicbrainz.org/release/{mb_id}",
+            artist=release.get("artist-credit-phrase", ""),
+            release_date=release.get("date") or "Unknown",
+            tracks=[],
+            stub=True,
+            extra_data={"mbid": mb_id, "release_country": release.get("country")},
+            upn=release.get("barcode"),
+            extra_info="(not credited to this artist)",
+            provider=self,
+        )
+        self.complete([album])
+        return album
+
+    def load_details(self, albums: list[Album]) -> None:
+        for album in albums:
+            release = get_release(album.extra_data["mbid"])
+            album.tracks = [
                 Track(
                     title=self._(track["recording"]["title"]),
                     artist=track["recording"]["artist-credit-phrase"],
@@ -39,26 +102,6 @@ class MusicBrainzProvider(Provider):
                 )
                 for medium in release["medium-list"] for track in medium["track-list"]
             ]
-            thumbnail = get_cover_art(release["id"])
-            extra_info: Optional[str] = None
-            if len(release["medium-list"]) >= 1:
-                extra_info = f"({release['medium-list'][0].get('format', 'Unknown Format')})"
-            finalized.append(
-                Album(
-                    title=self._(release["title"]),
-                    url=f"https://musicbrainz.org/release/{release['id']}",
-                    artist=release["artist-credit-phrase"],
-                    release_date=release.get("date", "Unknown"),
-                    tracks=tracks,
-                    extra_data={"mbid": release["id"], "release_country": release.get("country", None)},
-                    thumbnail=thumbnail,
-                    upn=release.get("barcode", None),
-                    extra_info=extra_info,
-                    provider=self,
-                )
-            )
-            self.finish_item()
-        return finalized
 
     @staticmethod
     def relevant(url: str) -> bool:
@@ -5,12 +5,13 @@ from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from enum import Enum
 from queue import Queue
+from threading import Lock
 from typing import Optional, Any
 
-from fuzzywuzzy import process
-from transliterate import translit
 from PIL.ImageFile import ImageFile
-from transliterate.exceptions import LanguageDetectionError
+
+from mbmc.normalize import Featured, normalize_album, transliterate_title
+from mbmc.providers.title_index import TitleIndex
 
 ArtistFormat = str | list[str | tuple[str, str]]
 
@@ -24,6 +25,9 @@ class Track:
     """duration in milliseconds"""
     track_nr: int
     disk_nr: int = 1
+    isrc: Optional[str] = None
+    featured: Optional[Featured] = None
+    """artist and title with featured artists split off, see mbmc.normalize"""
 
     def __getstate__(self) -> dict[str, Any]:
         state = self.__dict__.copy()
@@ -56,6 +60,33 @@ class Album:
     extra_data: dict[str, Any] = field(default_factory=dict)
     extra_info: Optional[str] = None
     status: AlbumStatus = AlbumStatus.TODO
+    track_count: Optional[int] = None
+    """number of tracks, if known before the tracks themselves have been loaded"""
+    stub: bool = False
+    """only listing data is present, details (i.e. tracks) are loaded with Provider.complete"""
+    cover_hash: Optional[int] = None
+    """perceptual hash of the cover art, see mbmc.cover_hash"""
+    alternate_urls: tuple[str, ...] = ()
+    """urls of identical editions listed separately by the provider"""
+    normalized_title: Optional[str] = None
+    """title processed for fuzzy matching, see mbmc.normalize"""
+    featured: Optional[Featured] = None
+    """artist and title with featured artists split off, see mbmc.normalize"""
+
+    def fill_details(self, details: Album) -> None:
+        """Take over the details of a fully loaded copy of this album, keeping title and status."""
+        self.artist = details.artist
+        self.release_date = details.release_date or self.release_date
+        self.tracks = details.tracks
+        self.genre = details.genre
+        self.upn = details.upn
+        self.extra_data.update(details.extra_data)
+        self.extra_info = details.extra_info or self.extra_info
+        self.track_count = len(details.tracks)
+        # The artist of the listing may have been incomplete
+        self.featured = None
+        for track in self.tracks:
+            track.provider = self.provider
 
     def __getstate__(self) -> dict[str, Any]:
         state = self.__dict__.copy()
@@ -73,6 +104,10 @@ class Provider(ABC):
         self.query: str = ""
         self.message_queue: Optional[Queue[str | tuple[str, int]]] = None
         self.albums: list[Album] = []
+        self.details_lock = Lock()
+        self.title_index = TitleIndex(Provider.normalize_name)
+        self.suggestions: list[Album] = []
+        """albums listed before the query results, i.e. those clustered with the current question"""
 
     def set_total_items(self, total: int) -> None:
         if self.message_queue is not None:
@@ -83,54 +118,52 @@ class Provider(ABC):
             self.message_queue.put(self.name)
 
     @abstractmethod
-    def fetch(self, url: str, ignore: list[str]) -> list[Album]:
+    def fetch(self, url: str, ignore: set[str]) -> list[Album]:
         raise NotImplementedError
 
+    def load_details(self, albums: list[Album]) -> None:
+        """Fill in details (i.e. tracks) of the given stubs, as returned by fetch."""
+        pass
+
+    def complete(self, albums: list[Album]) -> None:
+        """Make sure the given albums are fully loaded. Safe to call from multiple threads."""
+        with self.details_lock:
+            stubs = [album for album in albums if album.stub]
+            if stubs:
+                self.load_details(stubs)
+                for album in stubs:
+                    normalize_album(album)
+                    album.stub = False
+
     @staticmethod
     def normalize_name(album: Album | str) -> str:
         if isinstance(album, Album):
             album = album.title
-        try:
-            album = translit(album, reversed=True)
-        except LanguageDetectionError:
-            pass
-        return album.lower()
+        return transliterate_title(album)
 
     @staticmethod
     def _(input: str) -> str:
         return unicodedata.normalize("NFC", input)
 
+    def candidates(self, query: str) -> list[Album]:
+        self.title_index.sync(self.albums)
+        return self.title_index.search(
+            query,
+            lambda album: album.status == AlbumStatus.TODO or album.status == AlbumStatus.IGNORED,
+        )
+
     def filter(self) -> list[Album]:
         """Determine if this provider should be used based on available data."""
-        relevant = [album for album in self.albums if album.status == AlbumStatus.TODO or album.status == AlbumStatus.IGNORED]
-        chosen = process.extractBests(
-            self.query, relevant, score_cutoff=70, processor=Provider.normalize_name
-        )
-        return [album for album, _ in chosen]
-
-    def get_todo_name(self) -> Optional[str]:
-        for album in self.albums:
-            if album.status == AlbumStatus.TODO:
-                return album.title.lower().strip()
-        return None
-
-    def is_done(self, album: str) -> bool:
-        found_done: bool = False
-        found_todo: bool = False
-        album = album.lower().strip()
-        for a in self.albums:
-            if a.title.lower().strip() == album:
-                if a.status == AlbumStatus.TODO:
-                    found_todo = True
-                else:
-                    found_done = True
-        return found_done and not found_todo
-
-    def ignore_album(self, album: str) -> None:
-        album = album.lower().strip()
-        for a in self.albums:
-            if a.status == AlbumStatus.TODO and a.title.lower().strip() == album:
-                a.status = AlbumStatus.IGNORED
+        suggested = [
+            album
+            for album in self.suggestions
+            if album.status == AlbumStatus.TODO or album.status == AlbumStatus.IGNORED
+        ]
+        return suggested + [
+            album
+            for album in self.candidates(self.query)
+            if not any(album is suggestion for suggestion in suggested)
+        ]
 
     @staticmethod
     def format_artist_credit(artist: ArtistFormat) -> str:
@@ -154,7 +187,7 @@ class Provider(ABC):
         result: str = f"By {Provider.format_artist_credit(album.artist)}"
         if album.release_date:
             result += f", released {album.release_date}"
-        result += f", {len(album.tracks)} tracks"
+        result += f", {len(album.tracks) or album.track_count or 0} tracks"
         if album.upn:
             result += f", UPN {album.upn}"
         if album.extra_info:
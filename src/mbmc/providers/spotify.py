@@ -1,3 +1,4 @@
+from multiprocessing.pool import ThreadPool
 from pathlib import Path
 from typing import List, Optional
 
@@ -5,7 +6,7 @@ import spotipy
 from spotipy.oauth2 import SpotifyClientCredentials
 from spotipy.cache_handler import CacheFileHandler
 
-from mbmc.cache import cached
+from mbmc.cache import cached_batch
 from mbmc.music_brainz import normalize_url
 from mbmc.providers._mb_link_types import (
     ARTIST_FREE_STREAMING,
@@ -15,6 +16,14 @@ from mbmc.providers.provider import Provider, Album, Track, ArtistFormat
 from mbmc.util import CONFIG_DIR
 
 SESSION_FILE: Path = CONFIG_DIR / "spotify-session.txt"
+ALBUM_PAGE_SIZE: int = 50
+"""largest page size allowed by the artist albums endpoint"""
+INCLUDE_GROUPS: str = "album,single,compilation,appears_on"
+LISTING_THREADS: int = 4
+ALBUM_BATCH_SIZE: int = 20
+"""largest number of ids allowed by the several albums endpoint"""
+TRACK_BATCH_SIZE: int = 50
+"""largest number of ids allowed by the several tracks endpoint"""
 
 
 class SpotifyProvider(Provider):
@@ -31,9 +40,17 @@ class SpotifyProvider(Provider):
             for artist in item["artists"]
         )
 
-    @cached
-    def get_album(self, album_id: str) -> Album:
-        album = self.client.album(album_id)
+    def album_tracks(self, album: dict) -> list[dict]:
+        """Tracks of a full album object, loading any not embedded in it."""
+        track_page = album["tracks"]
+        raw_tracks = track_page["items"]
+        while track_page["next"]:
+            track_page = self.client.next(track_page)
+            raw_tracks.extend(track_page["items"])
+        return raw_tracks
+
+    def to_album(self, album: dict, raw_tracks: list[dict]) -> Album:
+        """Convert a full album object with its tracks, ISRCs are filled in by get_albums."""
         tracks = [
             Track(
                 title=self._(track["name"]),
@@ -43,9 +60,8 @@ class SpotifyProvider(Provider):
                 disk_nr=track["disc_number"],
                 provider=self,
             )
-            for track in self.client.album_tracks(album["id"])["items"]
+            for track in raw_tracks
         ]
-        album = self.client.album(album["id"])
         return Album(
             title=self._(album["name"]),
             artist=SpotifyProvider.item_to_artist(album),
@@ -57,26 +73,85 @@ class SpotifyProvider(Provider):
             provider=self,
         )
 
-    def fetch(self, url: str, ignore: list[str]) -> list[Album]:
+    def get_isrcs(self, track_ids: list[Optional[str]]) -> list[Optional[str]]:
+        """ISRCs of the given tracks, which are only part of full track objects."""
+        known_ids = [track_id for track_id in track_ids if track_id]
+        isrcs: dict[str, Optional[str]] = {}
+        for start in range(0, len(known_ids), TRACK_BATCH_SIZE):
+            response = self.client.tracks(known_ids[start:start + TRACK_BATCH_SIZE])
+            for track in response["tracks"]:
+                if track is not None:
+                    isrcs[track["id"]] = track.get("external_ids", {}).get("isrc")
+        return [isrcs.get(track_id) if track_id else None for track_id in track_ids]
+
+    @cached_batch
+    def get_albums(self, album_ids: list[str]) -> list[Optional[Album]]:
+        albums: list[Optional[Album]] = []
+        track_ids: list[Optional[str]] = []
+        for start in range(0, len(album_ids), ALBUM_BATCH_SIZE):
+            response = self.client.albums(album_ids[start:start + ALBUM_BATCH_SIZE])
+            for album in response["albums"]:
+                if album is None:
+                    albums.append(None)
+                    continue
+                raw_tracks = self.album_tracks(album)
+                albums.append(self.to_album(album, raw_tracks))
+                track_ids.extend(track["id"] for track in raw_tracks)
+        # Look up the ISRCs of the tracks of all albums together
+        isrcs = iter(self.get_isrcs(track_ids))
+        for album in albums:
+            if album is not None:
+                for track in album.tracks:
+                    track.isrc = next(isrcs)
+        return albums
+
+    def get_artist_albums(self, artist_id: str, offset: int = 0) -> dict:
+        return self.client.artist_albums(
+            artist_id, include_groups=INCLUDE_GROUPS, limit=ALBUM_PAGE_SIZE, offset=offset
+        )
+
+    def list_albums(self, artist_id: str) -> list[dict]:
+        """List all albums of an artist, fetching all pages after the first one concurrently."""
+        first_page = self.get_artist_albums(artist_id)
+        offsets = range(ALBUM_PAGE_SIZE, first_page["total"], ALBUM_PAGE_SIZE)
+        with ThreadPool(LISTING_THREADS) as pool:
+            pages = pool.map(lambda offset: self.get_artist_albums(artist_id, offset), offsets)
+        raw_items = first_page["items"]
+        for page in pages:
+            raw_items.extend(page["items"])
+        return raw_items
+
+    def to_stub(self, album: dict) -> Album:
+        """Convert a simplified album object from an artist listing, without tracks."""
+        return Album(
+            title=self._(album["name"]),
+            artist=SpotifyProvider.item_to_artist(album),
+            release_date=album["release_date"],
+            tracks=[],
+            track_count=album["total_tracks"],
+            url=normalize_url(album["external_urls"]["spotify"]),
+            thumbnail=album["images"][0]["url"] if album["images"] else None,
+            extra_data={"id": album["id"]},
+            stub=True,
+            provider=self,
+        )
+
+    def fetch(self, url: str, ignore: set[str]) -> list[Album]:
         finalized: list[Album] = []
-        last_response = self.client.artist_albums(url.split("/")[-1], limit=10)
-        raw_items = last_response["items"]
-        while last_response["next"]:
-            last_response = self.client.next(last_response)
-            raw_items.extend(last_response["items"])
+        raw_items = self.list_albums(url.split("/")[-1])
         self.set_total_items(len(raw_items))
         for album in raw_items:
-            if normalize_url(album["external_urls"]["spotify"]) in ignore:
-                self.finish_item()
-                continue
-            album = self.get_album(album["id"])
-            album.provider = self
-            for track in album.tracks:
-                track.provider = self
-            finalized.append(album)
+            if normalize_url(album["external_urls"]["spotify"]) not in ignore:
+                finalized.append(self.to_stub(album))
             self.finish_item()
         return finalized
 
+    def load_details(self, albums: list[Album]) -> None:
+        details = self.get_albums([album.extra_data["id"] for album in albums])
+        for album, detail in zip(albums, details):
+            if detail is not None:
+                album.fill_details(detail)
+
     @staticmethod
     def relevant(url: str) -> bool:
         return "open.spotify.com/artist/" in url
@@ -1,8 +1,10 @@
+import datetime
+import time
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 import tidalapi
-from tidalapi.exceptions import ObjectNotFound
+from tidalapi.exceptions import AuthenticationError, ObjectNotFound
 
 from mbmc.cache import cached
 from mbmc.providers._mb_link_types import (
@@ -11,21 +13,85 @@ from mbmc.providers._mb_link_types import (
 )
 from mbmc.providers.provider import Provider, Album, Track, ArtistFormat
 from mbmc.util import CONFIG_DIR
+from mbmc.vault import REFRESH_MARGIN, VAULT
 
 SESSION_FILE: Path = CONFIG_DIR / "tidal-session.txt"
+"""plaintext session of earlier versions, moved into the vault"""
+VAULT_NAME: str = "tidal-tokens"
+REFRESH_TOKEN_LIFETIME: float = 90 * 24 * 60 * 60
+"""seconds the refresh token is kept after it was last used, Tidal doesn't tell when it expires"""
 
 
 class TidalProvider(Provider):
     def __init__(self):
         super().__init__("Tidal")
         self.session = tidalapi.Session()
+        self.saved_access_token: Optional[str] = None
+        if not self.load_tokens():
+            self.login()
+
+    def load_tokens(self) -> bool:
+        """Restore the session from the vault, refreshing the access token if it is about to expire."""
+        tokens = VAULT.get(VAULT_NAME)
+        if tokens is None:
+            return False
+        self.session.token_type = tokens["token_type"]
+        self.session.access_token = tokens["access_token"]
+        self.session.refresh_token = tokens["refresh_token"]
+        self.session.is_pkce = tokens["is_pkce"]
+        # Entries of earlier versions don't know when the access token expires, refresh those
+        expires = tokens.get("expires", 0)
+        # tidalapi keeps expiry times in naive UTC
+        self.session.expiry_time = datetime.datetime.fromtimestamp(
+            expires, datetime.timezone.utc
+        ).replace(tzinfo=None)
+        try:
+            if expires - REFRESH_MARGIN < time.time():
+                if not self.session.token_refresh(self.session.refresh_token):
+                    return False
+            if not self.session.load_oauth_session(
+                self.session.token_type,
+                self.session.access_token,
+                self.session.refresh_token,
+                self.session.expiry_time,
+                self.session.is_pkce,
+            ):
+                return False
+        except AuthenticationError:
+            return False
+        self.save_tokens()
+        return True
+
+    def save_tokens(self) -> None:
+        """Store the tokens in the vault, if they changed (i.e. were refreshed during requests)."""
+        if self.session.access_token == self.saved_access_token:
+            return
+        VAULT.set(
+            VAULT_NAME,
+            {
+                "token_type": self.session.token_type,
+                "access_token": self.session.access_token,
+                "refresh_token": self.session.refresh_token,
+                "is_pkce": self.session.is_pkce,
+                "expires": self.session.expiry_time.replace(tzinfo=datetime.timezone.utc).timestamp(),
+            },
+            # The entry is needed for its refresh token, long after the access token expired
+            time.time() + REFRESH_TOKEN_LIFETIME,
+        )
+        self.saved_access_token = self.session.access_token
+
+    def login(self) -> None:
         try:
             self.session.load_session_from_file(SESSION_FILE)
             if not self.session.check_login():
                 self.session.login_oauth_simple()
         except Exception:
             self.session.login_oauth_simple()
-        self.session.save_session_to_file(SESSION_FILE)
+        SESSION_FILE.unlink(missing_ok=True)
+        if self.session.expiry_time is None:
+            # Sessions loaded from the file don't know when they expire, a refresh tells us
+            self.session.token_refresh(self.session.refresh_token)
+        self.save_tokens()
 
     @staticmethod
     def item_to_artist(item: tidalapi.Album | tidalapi.Track) -> ArtistFormat:
@@ -45,6 +111,7 @@ class TidalProvider(Provider):
                 artist=TidalProvider.item_to_artist(track),
                 duration=int(track.duration * 1000),
                 track_nr=track.track_num,
+                isrc=track.isrc or None,
                 provider=self,
             )
             for track in album.tracks()
@@ -60,7 +127,7 @@ class TidalProvider(Provider):
             provider=self,
         )
 
-    def fetch(self, url: str, ignore: list[str]) -> list[Album]:
+    def fetch(self, url: str, ignore: set[str]) -> list[Album]:
         try:
             artist = self.session.artist(url.split("/")[-1])
         except ObjectNotFound:
@@ -78,6 +145,8 @@ class TidalProvider(Provider):
                 track.provider = self
             finalized.append(album)
             self.finish_item()
+        # tidalapi refreshes expired access tokens on its own
+        self.save_tokens()
         return finalized
 
     @staticmethod
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+from typing import Callable, Iterable, Optional, TYPE_CHECKING
+
+from fuzzywuzzy import fuzz, utils
+
+if TYPE_CHECKING:
+    from mbmc.providers.provider import Album
+
+SCORE_CUTOFF: int = 70
+LIMIT: int = 5
+NGRAM: int = 3
+
+
+def ngrams(text: str) -> set[str]:
+    padded = f"{' ' * (NGRAM - 1)}{text} "
+    return {padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1)}
+
+
+def min_shared_ngrams(length: int, gram_count: int, cutoff: int) -> int:
+    """
+    N-grams a title of the given length with gram_count distinct n-grams shares at least with any
+    title it reaches the fuzz.ratio cutoff with. The ratio bounds the length of the other title and
+    the number of characters inserted or deleted between both, and each of those changes at most
+    NGRAM n-grams.
+    """
+    # ratio is rounded, allow for that
+    similarity = (cutoff - 0.5) / 100
+    longest = length * (2 - similarity) / similarity
+    edits = int((1 - similarity) * (length + longest))
+    return gram_count - NGRAM * edits
+
+
+class TitleIndex:
+    """
+    Fuzzy title lookup over a list of albums.
+    Titles are normalized once, and only albums sharing an n-gram with the query are scored.
+    Scores are the same as process.extractBests with fuzz.WRatio would give.
+    """
+
+    def __init__(self, normalize: Callable[[str], str]):
+        self.normalize: Callable[[str], str] = normalize
+        self.processed: dict[str, str] = {}
+        self.source: Optional[list[Album]] = None
+        self.albums: list[Album] = []
+        self.titles: list[str] = []
+        self.postings: dict[str, list[int]] = {}
+        self.short: list[int] = []
+
+    def process(self, title: str) -> str:
+        """Normalize a title the way extractBests processes both query and choices."""
+        if title not in self.processed:
+            self.processed[title] = utils.full_process(self.normalize(title), force_ascii=True)
+        return self.processed[title]
+
+    def sync(self, albums: list[Album]) -> None:
+        """Index any albums added since the last call, rebuilding if the list was replaced."""
+        if albums is not self.source or len(albums) < len(self.albums):
+            self.source = albums
+            self.albums = []
+            self.titles = []
+            self.postings = {}
+            self.short = []
+        for album in albums[len(self.albums):]:
+            position = len(self.albums)
+            if album.normalized_title is not None and album.title not in self.processed:
+                # Processed in the background already, see mbmc.normalize
+                self.processed[album.title] = album.normalized_title
+            title = self.process(album.title)
+            self.albums.append(album)
+            self.titles.append(title)
+            if len(title) < NGRAM:
+                # Too short to share an n-gram with similar titles, always score these
+                self.short.append(position)
+            for gram in ngrams(title):
+                self.postings.setdefault(gram, []).append(position)
+
+    def search(
+        self,
+        query: str,
+        accept: Callable[[Album], bool],
+        cutoff: int = SCORE_CUTOFF,
+        limit: Optional[int] = LIMIT,
+    ) -> list[Album]:
+        """The best matching accepted albums for the query, best first."""
+        return [album for album, _ in self.scored_search(query, accept, cutoff, limit)]
+
+    def similar(self, query: str, accept: Callable[[Album], bool], cutoff: int) -> list[Album]:
+        """
+        Accepted albums whose whole title is at least `cutoff` similar to the query, in index order.
+        Unlike search (WRatio), a title only contained in the other (i.e. "live" in "live at wembley")
+        doesn't score high. Only titles sharing enough n-grams to reach the cutoff are scored.
+        """
+        processed_query = self.process(query)
+        if not utils.validate_string(processed_query):
+            return []
+        grams = ngrams(processed_query)
+        required = min_shared_ngrams(len(processed_query), len(grams), cutoff)
+        if required <= 0:
+            positions: Iterable[int] = range(len(self.albums))
+        else:
+            shared: dict[int, int] = {}
+            for gram in grams:
+                for position in self.postings.get(gram, ()):
+                    shared[position] = shared.get(position, 0) + 1
+            positions = sorted(position for position, count in shared.items() if count >= required)
+        return [
+            self.albums[position]
+            for position in positions
+            if accept(self.albums[position])
+            and fuzz.ratio(processed_query, self.titles[position]) >= cutoff
+        ]
+
+    def scored_search(
+        self,
+        query: str,
+        accept: Callable[[Album], bool],
+        cutoff: int = SCORE_CUTOFF,
+        limit: Optional[int] = LIMIT,
+    ) -> list[tuple[Album, int]]:
+        """Like search, but with the score of every album."""
+        processed_query = self.process(query)
+        if not utils.validate_string(processed_query):
+            return []
+        if len(processed_query) < NGRAM:
+            positions = set(range(len(self.albums)))
+        else:
+            positions = set(self.short)
+            for gram in ngrams(processed_query):
+                positions.update(self.postings.get(gram, ()))
+        scored: list[tuple[int, int]] = []
+        for position in sorted(positions):
+            if not accept(self.albums[position]):
+                continue
+            score = fuzz.WRatio(processed_query, self.titles[position], full_process=False)
+            if score >= cutoff:
+                scored.append((score, position))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [(self.albums[position], score) for score, position in scored[:limit]]
@@ -1,20 +1,27 @@
 import hashlib
+import json
 import re
-from functools import cache
-from typing import TypedDict, List, Literal
+import time
+from typing import TypedDict, List, Literal, Optional
 from urllib.parse import urlparse, parse_qs, urlunparse, urlencode
 
 import requests
-from requests.cookies import RequestsCookieJar
 
 from mbmc.providers._mb_link_types import (
     ARTIST_FREE_STREAMING,
     RELEASE_FREE_STREAMING,
 )
 from mbmc.providers.provider import Provider, Album, ArtistFormat, Track
-from mbmc.cache import cached
+from mbmc.cache import cached_batch
+from mbmc.vault import vaulted
 
 USER_AGENT: str = "Mozilla/5.0 (X11; Linux x86_64; rv:153.0) Gecko/20100101 Firefox/153.0"
+EXECUTE_CALL_LIMIT: int = 25
+AUDIOS_PER_CALL: int = 100
+# Fallback lifetimes (in seconds) of credentials that don't state when they expire
+COOKIE_LIFETIME: float = 24 * 60 * 60
+OAUTH_LIFETIME: float = 7 * 24 * 60 * 60
+TOKEN_LIFETIME: float = 60 * 60
 
 
 class Playlist(TypedDict):
@@ -25,8 +32,8 @@ class Playlist(TypedDict):
     access_key: str
 
 
-@cache
-def get_cookies() -> RequestsCookieJar:
+@vaulted
+def get_cookies() -> tuple[dict[str, str], float]:
     request = requests.get(
         "https://vk.com/challenge.html",
         allow_redirects=True,
@@ -67,11 +74,13 @@ def get_cookies() -> RequestsCookieJar:
     )
     result = requests.get(new_url, allow_redirects=True)
     result.raise_for_status()
-    return result.cookies
+    expiries = [cookie.expires for cookie in result.cookies if cookie.expires]
+    expires = min(expiries, default=time.time() + COOKIE_LIFETIME)
+    return result.cookies.get_dict(), expires
 
 
-@cache
-def get_oauth() -> tuple[str, str, str]:
+@vaulted
+def get_oauth() -> tuple[tuple[str, str, str], float]:
     request = requests.get("https://vk.ru", headers={"User-Agent": USER_AGENT})
     request.raise_for_status()
     match = re.search(
@@ -100,12 +109,13 @@ def get_oauth() -> tuple[str, str, str]:
         if value is not None:
             variables[target] = value
     if client_id_name in variables and client_secret_name in variables:
-        return variables[client_id_name], variables[client_secret_name], version.group(1)
+        credentials = variables[client_id_name], variables[client_secret_name], version.group(1)
+        return credentials, time.time() + OAUTH_LIFETIME
     raise RuntimeError(f"Couldn't find {client_id_name} and {client_secret_name}")
 
 
-@cache
-def get_access_token() -> str:
+@vaulted
+def get_access_token() -> tuple[str, float]:
     client_id, client_secret, _ = get_oauth()
     request = requests.post(
         "https://login.vk.com/?act=get_anonym_token",
@@ -125,30 +135,41 @@ def get_access_token() -> str:
     request.raise_for_status()
     content = request.json()
     assert content["type"] == "okay"
-    return content["data"]["access_token"]
+    data = content["data"]
+    return data["access_token"], data.get("expired_at") or time.time() + TOKEN_LIFETIME
 
 
-def vk_artist(obj: dict) -> ArtistFormat:
+def artist_domains(obj: dict) -> list[str]:
+    return [artist["domain"] for artist in obj["main_artists"] + obj.get("featured_artists", [])]
+
+
+def vk_artist(obj: dict, resolved: dict[str, Optional[str]]) -> ArtistFormat:
+    """Artist credit of a playlist or audio, artists that could not be resolved have no url."""
     result = []
     for artist in obj["main_artists"]:
-        result.append((Provider._(artist["name"]), resolve_artist(artist["domain"])))
+        result.append((Provider._(artist["name"]), resolved[artist["domain"]] or "unknown"))
         result.append(", ")
     result.pop()
     if "featured_artists" in obj:
         result.append(" feat. ")
         for artist in obj["featured_artists"]:
-            result.append((artist["name"], resolve_artist(artist["domain"])))
+            result.append((artist["name"], resolved[artist["domain"]] or "unknown"))
             result.append(", ")
         result.pop()
     return result
 
 
+def prepare_parameters(data: dict) -> dict:
+    if "url" in data:
+        data["url"] = data["url"].replace("https://vk.com", "https://vk.ru")
+    return data
+
+
 def api_call(path: str, data: dict) -> dict:
     client_id, _, version = get_oauth()
     if "access_token" not in data:
         data["access_token"] = get_access_token()
-    if "url" in data:
-        data["url"] = data["url"].replace("https://vk.com", "https://vk.ru")
+    prepare_parameters(data)
     request = requests.post(
         f"https://web.api.vk.ru/method/{path}?v={version}&client_id={client_id}",
         headers={
@@ -161,19 +182,42 @@ def api_call(path: str, data: dict) -> dict:
     request.raise_for_status()
     return request.json()["response"]
 
-@cached
-def resolve_artist(domain: str) -> str:
-    response = api_call(
-        "catalog.getAudioArtist",
-        {
-            "url": f"https://vk.com/artist/{domain}",
-            "need_blocks": "1",
-            "aritst_id": domain,
-            "ref": ""
-        }
-    )
-    result = response["artists"][0]["domain"]
-    return f"https://vk.com/artist/{result}"
+
+def execute(calls: list[tuple[str, dict]]) -> list:
+    """
+    Run api calls through the execute method, which allows up to 25 calls per request.
+    Results are returned in the order of the calls, failed calls result in False.
+    """
+    results = []
+    for start in range(0, len(calls), EXECUTE_CALL_LIMIT):
+        code = ",".join(
+            f"API.{method}({json.dumps(prepare_parameters(data))})"
+            for method, data in calls[start:start + EXECUTE_CALL_LIMIT]
+        )
+        results.extend(api_call("execute", {"code": f"return [{code}];"}))
+    return results
+
+
+@cached_batch
+def resolve_artists(domains: list[str]) -> list[Optional[str]]:
+    responses = execute([
+        (
+            "catalog.getAudioArtist",
+            {
+                "url": f"https://vk.com/artist/{domain}",
+                "need_blocks": "1",
+                "aritst_id": domain,
+                "ref": ""
+            },
+        )
+        for domain in domains
+    ])
+    return [
+        f"https://vk.com/artist/{response['artists'][0]['domain']}"
+        if response and response.get("artists")
+        else None
+        for response in responses
+    ]
 
 
 class VkMusicProvider(Provider):
@@ -198,30 +242,89 @@ class VkMusicProvider(Provider):
             return []
         return response["playlists"]
 
-    @cached
-    def get_album(self, owner_id: str, playlist_id: str, access_key: str) -> Album:
-        album_information = api_call(
-            "audio.getPlaylistById",
-            {
-                "playlist_id": playlist_id,
-                "owner_id": owner_id,
-                "access_key": access_key,
-                "extra_fields": "owner, duration",
-            },
-        )["playlist"]
-        audios = api_call(
-            "audio.getIdsBySource",
-            {
-                "entity_id": f"{owner_id}_{playlist_id}_{access_key}",
-                "source": "playlist",
-                "ref": "",
-            },
-        )
-        audios = [i["audio_id"] for i in audios["audios"]]
-        track_data = api_call(
-            "audio.getById",
-            {"audios": ",".join(audios)},
-        )
+    @cached_batch
+    def get_albums(self, playlists: list[tuple[str, str, str]]) -> list[Optional[Album]]:
+        """
+        Load playlists, given as owner id, playlist id and access key, in as few requests as possible.
+        Playlists that are not available result in None.
+        """
+        responses = execute([
+            call
+            for owner_id, playlist_id, access_key in playlists
+            for call in (
+                (
+                    "audio.getPlaylistById",
+                    {
+                        "playlist_id": playlist_id,
+                        "owner_id": owner_id,
+                        "access_key": access_key,
+                        "extra_fields": "owner, duration",
+                    },
+                ),
+                (
+                    "audio.getIdsBySource",
+                    {
+                        "entity_id": f"{owner_id}_{playlist_id}_{access_key}",
+                        "source": "playlist",
+                        "ref": "",
+                    },
+                ),
+            )
+        ])
+        available = [
+            bool(information) and bool(ids)
+            for information, ids in zip(responses[0::2], responses[1::2])
+        ]
+        album_information = [
+            response["playlist"] if ok else None
+            for response, ok in zip(responses[0::2], available)
+        ]
+        audio_ids = [
+            [i["audio_id"] for i in response["audios"]] if ok else []
+            for response, ok in zip(responses[1::2], available)
+        ]
+        # Look up the audios of all playlists together
+        unique_ids = list(dict.fromkeys(audio_id for ids in audio_ids for audio_id in ids))
+        audio_chunks = [
+            unique_ids[start:start + AUDIOS_PER_CALL]
+            for start in range(0, len(unique_ids), AUDIOS_PER_CALL)
+        ]
+        audios: dict[str, dict] = {}
+        for track_data in execute([("audio.getById", {"audios": ",".join(chunk)}) for chunk in audio_chunks]):
+            for track in track_data or []:
+                audios[f"{track['owner_id']}_{track['id']}"] = track
+        playlist_tracks = [
+            [
+                audios[key]
+                for key in ("_".join(audio_id.split("_")[:2]) for audio_id in ids)
+                if key in audios
+            ]
+            for ids in audio_ids
+        ]
+        domains = list(dict.fromkeys(
+            domain
+            for obj in [information for information in album_information if information is not None]
+            + [track for tracks in playlist_tracks for track in tracks]
+            for domain in artist_domains(obj)
+        ))
+        resolved = dict(zip(domains, resolve_artists(domains)))
+        return [
+            self.to_album(owner_id, playlist_id, information, track_data, resolved)
+            if information is not None
+            else None
+            for (owner_id, playlist_id, _), information, track_data in zip(
+                playlists, album_information, playlist_tracks
+            )
+        ]
+
+    def to_album(
+        self,
+        owner_id: str,
+        playlist_id: str,
+        album_information: dict,
+        track_data: list[dict],
+        resolved: dict[str, str],
+    ) -> Album:
         tracks = []
         for i, track in enumerate(track_data):
             duration = track.get("duration", None)
@@ -230,7 +333,7 @@ class VkMusicProvider(Provider):
             tracks.append(Track(
                 provider=self,
                 title=self._(track["title"]),
-                artist=vk_artist(track),
+                artist=vk_artist(track, resolved),
                 duration=duration,
                 track_nr=i + 1,
             ))
@@ -247,24 +350,29 @@ class VkMusicProvider(Provider):
             provider=self,
             title=self._(album_information["title"]),
             url=f"https://vk.com/music/album/{owner_id}_{playlist_id}",
-            artist=vk_artist(album_information),
+            artist=vk_artist(album_information, resolved),
             release_date=str(album_information["year"]),
             tracks=tracks,
             thumbnail=thumbnail,
             genre=[i["name"] for i in album_information["genres"]],
         )
 
-    def fetch(self, url: str, ignore: list[str]) -> list[Album]:
+    def fetch(self, url: str, ignore: set[str]) -> list[Album]:
         artist_name: str = url.split("/")[-1]
         albums = self.get_releases(artist_name, "albums")
         albums.extend(self.get_releases(artist_name, "singles"))
         finalized: list[Album] = []
         self.set_total_items(len(albums))
+        playlists: list[tuple[str, str, str]] = []
         for album in albums:
             if f"https://vk.com/music/album/{album['owner_id']}_{album['id']}" in ignore:
                 self.finish_item()
                 continue
-            album = self.get_album(str(album["owner_id"]), str(album["id"]), album["access_key"])
+            playlists.append((str(album["owner_id"]), str(album["id"]), album["access_key"]))
+        for album in self.get_albums(playlists):
+            if album is None:
+                self.finish_item()
+                continue
             album.provider = self
             for track in album.tracks:
                 track.provider = self
@@ -37,6 +37,10 @@ class YouTubeMusicProvider(Provider):
             for artist in item["artists"]
         ]
 
+    @staticmethod
+    def playlist_url(playlist_id: str) -> str:
+        return f"https://music.youtube.com/playlist?list={playlist_id}"
+
     @cached
     def get_album(self, browse_id: str) -> Album:
         album: types.Album = self.client.get_album(browse_id)
@@ -55,12 +59,12 @@ class YouTubeMusicProvider(Provider):
             artist=YouTubeMusicProvider.item_to_artist(album),
             release_date=album.get("year", "Unknown"),
             tracks=tracks,
-            url=f"https://music.youtube.com/playlist?list={album['audioPlaylistId']}",
+            url=YouTubeMusicProvider.playlist_url(album["audioPlaylistId"]),
             thumbnail=album.get("thumbnails", [{}])[-1].get("url", None),
             provider=self,
         )
 
-    def fetch(self, url: str, ignore: list[str]) -> list[Album]:
+    def fetch(self, url: str, ignore: set[str]) -> list[Album]:
         try:
             artist: types.Artist = self.client.get_artist(url.split("/")[-1])
         except KeyError:
@@ -71,6 +75,11 @@ class YouTubeMusicProvider(Provider):
         all_releases = albums + singles
         self.set_total_items(len(all_releases))
         for base_album in all_releases:
+            # Listings mostly include the audio playlist, skip ignored releases before loading details
+            playlist_id = base_album.get("audioPlaylistId") or base_album.get("playlistId")
+            if playlist_id and YouTubeMusicProvider.playlist_url(playlist_id) in ignore:
+                self.finish_item()
+                continue
             album = self.get_album(base_album["browseId"])
             if album.url in ignore:
                 self.finish_item()
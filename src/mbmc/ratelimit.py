@@ -0,0 +1,24 @@
+from collections import deque
+from threading import Lock
+from time import monotonic, sleep
+
+
+class RateLimiter:
+    """Allow at most `calls` calls within any `period` seconds, blocking callers until allowed."""
+
+    def __init__(self, calls: int, period: float):
+        self.calls: int = calls
+        self.period: float = period
+        self.history: deque[float] = deque()
+        self.lock = Lock()
+
+    def wait(self) -> None:
+        with self.lock:
+            while True:
+                now = monotonic()
+                while self.history and self.history[0] <= now - self.period:
+                    self.history.popleft()
+                if len(self.history) < self.calls:
+                    self.history.append(now)
+                    return
+                sleep(self.history[0] + self.period - now)
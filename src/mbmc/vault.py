@@ -0,0 +1,127 @@
+"""
+Encrypted store for credentials that are expensive to obtain (scraped API keys, session tokens).
+
+Every entry is saved together with the unix time it expires at, and is only handed out again
+while it is not about to expire. The key is kept in the OS keyring. Without a usable keyring it
+falls back to a file next to the vault, which then only obfuscates the credentials.
+"""
+
+import json
+import os
+import threading
+import time
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Optional, TypeVar
+
+import keyring
+from cryptography.fernet import Fernet, InvalidToken
+from keyring.errors import KeyringError
+
+from mbmc.util import CONFIG_DIR
+
+VAULT_FILE: Path = CONFIG_DIR / "vault.bin"
+KEY_FILE: Path = CONFIG_DIR / "vault.key"
+"""fallback for the key without a usable keyring"""
+KEYRING_SERVICE: str = "mbmc"
+KEYRING_USERNAME: str = "vault-key"
+# Refresh credentials this many seconds before they expire, so they don't run out mid-run
+REFRESH_MARGIN: float = 15 * 60
+
+V = TypeVar("V")
+
+
+def load_key(path: Path) -> bytes:
+    """
+    Load the vault key from the OS keyring, creating one if there is none.
+    A key left in the fallback file (i.e. from before a keyring was available) is moved there.
+    """
+    try:
+        key = keyring.get_password(KEYRING_SERVICE, KEYRING_USERNAME)
+        if key is None:
+            key = path.read_text() if path.exists() else Fernet.generate_key().decode()
+            keyring.set_password(KEYRING_SERVICE, KEYRING_USERNAME, key)
+        path.unlink(missing_ok=True)
+        return key.encode()
+    except KeyringError:
+        print(f"No usable keyring, the vault key is stored unencrypted in {path}")
+        return load_key_file(path)
+
+
+def load_key_file(path: Path) -> bytes:
+    """Load the vault key from a file, creating one only readable by the current user if there is none."""
+    if path.exists():
+        return path.read_bytes()
+    key = Fernet.generate_key()
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as file:
+        file.write(key)
+    return key
+
+
+class Vault:
+    """Credentials keyed by name, encrypted at rest, safe to use from multiple threads."""
+
+    def __init__(self, path: Path, key_path: Path):
+        self.path: Path = path
+        self.fernet = Fernet(load_key(key_path))
+        self.lock = threading.Lock()
+        self.entries: dict[str, tuple[Any, float]] = self.load()
+
+    def load(self) -> dict[str, tuple[Any, float]]:
+        if not self.path.exists():
+            return {}
+        try:
+            content = json.loads(self.fernet.decrypt(self.path.read_bytes()))
+        except (InvalidToken, ValueError):
+            # Unreadable (e.g. the key was replaced), start over and re-authenticate
+            return {}
+        return {name: (value, expires) for name, (value, expires) in content.items()}
+
+    def save(self) -> None:
+        data = self.fernet.encrypt(json.dumps(self.entries).encode())
+        temporary = self.path.with_suffix(".tmp")
+        fd = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        temporary.replace(self.path)
+
+    def get(self, name: str) -> Optional[Any]:
+        """The stored value, or None if there is none or it is about to expire."""
+        with self.lock:
+            entry = self.entries.get(name)
+        if entry is None or entry[1] - REFRESH_MARGIN < time.time():
+            return None
+        return entry[0]
+
+    def set(self, name: str, value: Any, expires: float) -> None:
+        """Store a JSON serializable value until the unix time `expires`."""
+        with self.lock:
+            self.entries[name] = (value, expires)
+            now = time.time()
+            self.entries = {
+                key: entry for key, entry in self.entries.items() if entry[1] > now
+            }
+            self.save()
+
+
+VAULT: Vault = Vault(VAULT_FILE, KEY_FILE)
+
+
+def vaulted(func: Callable[[], tuple[V, float]]) -> Callable[[], V]:
+    """
+    Decorator persisting the result of a credential function in the vault.
+    The function returns the credential and the unix time it expires at,
+    and is only called again once the stored credential is about to expire.
+    """
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @wraps(func)
+    def wrapper() -> V:
+        value = VAULT.get(name)
+        if value is None:
+            value, expires = func()
+            VAULT.set(name, value, expires)
+        return value
+
+    return wrapper
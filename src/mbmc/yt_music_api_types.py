@@ -12,6 +12,10 @@ class AlbumResult(TypedDict):
     year: str
     browseId: str
     thumbnails: list[Thumbnail]
+    audioPlaylistId: Optional[str]
+    """present in the results of the artist page"""
+    playlistId: Optional[str]
+    """present in the results of get_artist_albums"""
 
 
 class SingleResult(TypedDict):